@@ -0,0 +1,107 @@
+"""
+Loop-heavy, synchronous helpers used by Speaker, Reporter and WebResearcher.
+
+They live in their own fully annotated module so it can optionally be
+compiled with mypyc (`mypyc _hot.py`). The compiled extension is picked up
+automatically on import; without it the plain Python module is used.
+Keep async code out of this module.
+"""
+import hashlib
+import re
+from typing import Dict, Iterator, List, NamedTuple
+from agent import TaskResult
+
+# Sentence ends (whitespace after . ! ?) and line breaks
+_SENTENCE_BOUNDARY_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+
+_WORD_RE = re.compile(r'\w+')
+
+class ReportStats(NamedTuple):
+    """Aggregate research metrics, computed once per report."""
+    total: int
+    completed: int
+    total_sources: int
+    avg_confidence: float
+
+def iter_sentences(text: str) -> Iterator[str]:
+    """Yield the non-empty sentences of text without copying the whole buffer."""
+    start = 0
+    for match in _SENTENCE_BOUNDARY_RE.finditer(text):
+        sentence = text[start:match.start()].strip()
+        if sentence:
+            yield sentence
+        start = match.end()
+    sentence = text[start:].strip()
+    if sentence:
+        yield sentence
+
+def split_into_chunks(text: str, max_length: int) -> List[str]:
+    """Splits text into chunks by sentences, respecting the max_length."""
+    chunks: List[str] = []
+    current_chunk: List[str] = []
+    current_length = 0
+
+    for sentence in iter_sentences(text):
+        if current_chunk and current_length + len(sentence) + 1 > max_length:
+            chunks.append(" ".join(current_chunk))
+            current_chunk = []
+            current_length = 0
+        current_chunk.append(sentence)
+        current_length += len(sentence) + 1
+
+    if current_chunk:
+        chunks.append(" ".join(current_chunk))
+
+    return chunks
+
+def compute_stats(results: List[TaskResult]) -> ReportStats:
+    """
+    Collect task, source and confidence metrics in a single pass over results.
+    A URL cited by several results counts once towards total_sources.
+    """
+    # A plain loop on purpose: a run produces at most ~10 results (one per
+    # subtopic), far below the size where a numpy conversion would pay off.
+    completed = 0
+    unique_sources: Dict[str, float] = {}  # dict keeps first-seen order
+    total_confidence = 0.0
+    valid_scores = 0
+
+    for result in results:
+        if result.status == "completed":
+            completed += 1
+        for url in result.sources:
+            unique_sources.setdefault(url, result.confidence_score)
+        if result.confidence_score is not None:
+            total_confidence += result.confidence_score
+            valid_scores += 1
+
+    avg_confidence = total_confidence / valid_scores if valid_scores else 0.0
+    return ReportStats(len(results), completed, len(unique_sources), avg_confidence)
+
+def simhash64(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over word shingles; similar texts differ in few bits."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    weights = [0] * 64
+    for shingle in shingles:
+        digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "big")
+        for bit in range(64):
+            if (value >> bit) & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+
+    fingerprint = 0
+    for bit in range(64):
+        if weights[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints."""
+    return bin(a ^ b).count("1")
@@ -32,4 +32,16 @@ class BaseAgent(ABC):
         '''Used in systems where different "handlers" or "workers" are responsible for specific types of tasks, 
         allowing a dispatcher to route tasks to the appropriate handler.
         '''
-        pass
\ No newline at end of file
+        pass
+
+    async def warm_up(self):
+        '''Optional hook to prepare resources (connections, caches) before tasks arrive.
+        Called by the supervisor while it waits on user input; the default does nothing.
+        '''
+        pass
+
+    async def aclose(self):
+        '''Optional hook to release resources opened by the agent (e.g. HTTP sessions).
+        Called by the supervisor when a research run ends; the default does nothing.
+        '''
+        pass
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import time
+from functools import lru_cache
+from typing import Optional
+import httpx
+import openai
+from dotenv import load_dotenv
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+
+load_dotenv()
+
+# Retry decorator for OpenAI calls: up to 3 attempts with jittered exponential
+# backoff on transient errors (429, 5xx, dropped connections, timeouts). The
+# last error is re-raised so callers' fallback paths still apply.
+openai_retry = retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential_jitter(initial=1, max=8),
+    retry=retry_if_exception_type((
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.APITimeoutError,
+        openai.InternalServerError,
+    )),
+    reraise=True
+)
+
+def get_openai(api_key: Optional[str] = None) -> openai.AsyncOpenAI:
+    """
+    Return the shared AsyncOpenAI client for api_key (default: OPENAI_API_KEY).
+
+    All agents share one client so they also share its HTTP connection pool;
+    keep-alive connections are reused across calls instead of paying a new
+    TCP/TLS handshake for each request.
+    """
+    return _get_async_client(api_key or os.getenv("OPENAI_API_KEY"))
+
+@lru_cache(maxsize=4)
+def _get_async_client(api_key: Optional[str]) -> openai.AsyncOpenAI:
+    # Sized for the supervisor's parallel sub-agent fan-out plus TTS parts
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+        timeout=httpx.Timeout(60.0)
+    )
+    return openai.AsyncOpenAI(api_key=api_key, http_client=http_client)
+
+class RateLimiter:
+    """
+    Async token bucket for API requests: at most max_rate requests per
+    time_period seconds. update_from_headers() slows the bucket down to the
+    server's remaining request budget once less than 10% of it is left, and
+    restores the full rate when the budget recovers.
+    """
+    def __init__(self, max_rate: int = 500, time_period: float = 60.0):
+        self.max_rate = max_rate
+        self.time_period = time_period
+        self.rate = float(max_rate)
+        self._tokens = float(max_rate)
+        self._updated = time.monotonic()
+        self._lock = None  # Created on first use, inside the running loop
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.time_period)
+        self._updated = now
+
+    async def acquire(self):
+        """Wait until a request token is available and take it."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) * self.time_period / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def update_from_headers(self, headers):
+        """Adjust the rate from OpenAI's x-ratelimit-*-requests response headers."""
+        try:
+            remaining = int(headers["x-ratelimit-remaining-requests"])
+            limit = int(headers["x-ratelimit-limit-requests"])
+        except (KeyError, TypeError, ValueError):
+            return
+        if limit > 0 and remaining < limit * 0.1:
+            self.rate = float(max(1, min(remaining, self.max_rate)))
+        else:
+            self.rate = float(self.max_rate)
+        self._tokens = min(self._tokens, self.rate)
@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Any, Callable, Dict, List, Optional
+from clients import RateLimiter, openai_retry
+
+class ResponseCache:
+    """
+    Small on-disk key/value cache for text responses.
+
+    Every entry expires ttl_seconds after it is written. Callers choose the
+    keys; the cache only stores and expires the text.
+    """
+    def __init__(self, cache_dir: str = ".llm_cache", ttl_seconds: int = 7 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.db_path = os.path.join(cache_dir, "responses.sqlite3")
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, content TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # Callers close the connection with contextlib.closing; the inner
+        # "with conn" only commits
+        return sqlite3.connect(self.db_path)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached content for key, or None if missing or expired."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT content, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        content, expires_at = row
+        if expires_at < time.time():
+            return None
+        return content
+
+    def set(self, key: str, content: str):
+        """Store content under key for ttl_seconds."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content, expires_at) VALUES (?, ?, ?)",
+                (key, content, time.time() + self.ttl_seconds)
+            )
+    
+    async def aget(self, key: str) -> Optional[str]:
+        """get() in a worker thread, so the SQLite read does not block the event loop."""
+        return await asyncio.to_thread(self.get, key)
+    
+    async def aset(self, key: str, content: str):
+        """set() in a worker thread, so the SQLite write does not block the event loop."""
+        await asyncio.to_thread(self.set, key, content)
+
+class LLMResponseCache(ResponseCache):
+    """
+    Small on-disk cache for chat completion text.
+
+    Entries are keyed by a SHA-256 of (model, temperature, messages), so an
+    identical request (same report, same prompts) is answered from disk
+    instead of re-running inference.
+    """
+    @staticmethod
+    def make_key(model: str, temperature: float, messages: List[Dict[str, Any]]) -> str:
+        """Build the cache key for a chat completion request."""
+        payload = json.dumps([model, temperature, messages], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+@openai_retry
+async def _create_chat_completion(client, request: Dict[str, Any],
+                                  rate_limiter: Optional[RateLimiter] = None) -> str:
+    if rate_limiter is None:
+        response = await client.chat.completions.create(**request)
+        return response.choices[0].message.content
+    # Every attempt, retries included, takes a token; the raw response
+    # exposes the rate-limit headers that tune the limiter.
+    async with rate_limiter:
+        raw = await client.chat.completions.with_raw_response.create(**request)
+    rate_limiter.update_from_headers(raw.headers)
+    return raw.parse().choices[0].message.content
+
+@openai_retry
+async def _open_chat_stream(client, request: Dict[str, Any]):
+    # Only opening the stream is retried; a failure mid-stream propagates so
+    # paragraphs already handed to on_paragraph are never emitted twice.
+    return await client.chat.completions.create(**request, stream=True)
+
+def _emit_paragraphs(text: str, on_paragraph: Callable[[str], None]) -> str:
+    """Pass every complete paragraph in text to on_paragraph; return the unfinished tail."""
+    *paragraphs, tail = text.split("\n\n")
+    for paragraph in paragraphs:
+        if paragraph.strip():
+            on_paragraph(paragraph)
+    return tail
+
+async def _stream_chat_completion(client, request: Dict[str, Any],
+                                  on_paragraph: Optional[Callable[[str], None]] = None) -> str:
+    stream = await _open_chat_stream(client, request)
+    buffer = io.StringIO()
+    pending = ""
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        buffer.write(delta)
+        if on_paragraph is not None:
+            pending = _emit_paragraphs(pending + delta, on_paragraph)
+    if on_paragraph is not None and pending.strip():
+        on_paragraph(pending)
+    return buffer.getvalue()
+
+async def cached_chat_completion(client, cache: Optional[LLMResponseCache], messages: List[Dict[str, Any]],
+                                 model: str, temperature: float, max_tokens: Optional[int] = None,
+                                 response_format: Optional[Dict[str, Any]] = None,
+                                 stream: bool = False,
+                                 on_paragraph: Optional[Callable[[str], None]] = None,
+                                 rate_limiter: Optional[RateLimiter] = None) -> str:
+    """
+    Run a chat completion through the response cache.
+
+    Returns the message content. On a cache hit no API call is made; on a miss
+    the response is stored before returning. Transient API errors are retried
+    with backoff. Pass cache=None to bypass caching.
+
+    With stream=True the completion is streamed and on_paragraph (if given) is
+    called with each paragraph as soon as it is complete. Cached content is
+    replayed through on_paragraph the same way.
+
+    Non-streaming requests wait on rate_limiter, if given, before each
+    attempt.
+    """
+    key = None
+    if cache is not None:
+        key = cache.make_key(model, temperature, messages)
+        cached = await cache.aget(key)
+        if cached is not None:
+            if on_paragraph is not None:
+                tail = _emit_paragraphs(cached, on_paragraph)
+                if tail.strip():
+                    on_paragraph(tail)
+            return cached
+
+    request = {"model": model, "messages": messages, "temperature": temperature}
+    if max_tokens is not None:
+        request["max_tokens"] = max_tokens
+    if response_format is not None:
+        request["response_format"] = response_format
+    if stream:
+        content = await _stream_chat_completion(client, request, on_paragraph)
+    else:
+        content = await _create_chat_completion(client, request, rate_limiter)
+
+    if cache is not None and content:
+        await cache.aset(key, content)
+    return content
@@ -39,10 +39,13 @@ class DeepResearchSystem:
             # Display questions to the user
             print("\n" + question_message)
             
-            # Collect user responses
+            # Let sub-agents get ready while the user is typing
+            warm_up = asyncio.create_task(self.supervisor._warm_up_agents())
+            
+            # Collect user responses without blocking the event loop
             user_responses = []
             for i, question in enumerate(questions, 1):
-                response = input(f"Your answer to question {i}: ")
+                response = await asyncio.to_thread(input, f"Your answer to question {i}: ")
                 user_responses.append(response)
             
             # Create additional context from user responses
@@ -56,12 +59,13 @@ class DeepResearchSystem:
             
             # Step 2: Execute tasks - Delegate to sub-agents
             print("🔍 Executing research tasks...")
-            results = await self.supervisor.delegate_tasks(tasks)
-            print(f"✅ Completed {len(results)} research tasks")
+            await warm_up
+            results = self.supervisor.delegate_tasks_as_completed(tasks)
             
-            # Step 3: Generate comprehensive report
-            print("📊 Generating final report...")
-            report = await self.reporter.generate_report(topic, results, research_brief)
+            # Step 3: Generate comprehensive report, formatting findings as
+            # each task completes
+            print("📊 Collecting results and generating final report...")
+            report = await self.reporter.stream_generate_report(topic, results, research_brief)
             
             print("🎉 Research completed successfully!")
             return report
@@ -69,7 +73,10 @@ class DeepResearchSystem:
         except Exception as e:
             print(f"❌ Research failed: {e}")
             # Return error report
-            return await self._generate_error_report(topic, str(e))
+            return self._generate_error_report(topic, str(e))
+        finally:
+            # Release sub-agent connections (e.g. the researcher's HTTP session)
+            await self.supervisor._close_agents()
     
     async def get_research_status(self) -> Dict[str, Any]:
         """Get current system status and capabilities."""
@@ -85,7 +92,7 @@ class DeepResearchSystem:
             "reporter_model": self.reporter.model_name
         }
     
-    async def _generate_error_report(self, topic: str, error_message: str) -> str:
+    def _generate_error_report(self, topic: str, error_message: str) -> str:
         """Generate error report when research fails."""
         return f"""
         # Research Report: {topic}
@@ -104,6 +111,11 @@ class DeepResearchSystem:
         - Contact system administrator if the problem persists
         """
 
+def _save_report(filename: str, report: str):
+    """Write the report to disk (run in a worker thread)."""
+    with open(filename, "w") as f:
+        f.write(report)
+
 async def main():
     """Main function to run deep research."""
     print("🔬 Deep Research Tool")
@@ -119,21 +131,29 @@ async def main():
             
         report = await system.conduct_web_research(topic)
         
-        # Save report to file
+        # Start the podcast script rewrite right away; it only needs the report
+        speaker = Speaker()
+        script_task = asyncio.create_task(speaker._edit_report_for_podcast(report, topic))
+        
+        # Save report to file while the script is being written
         filename = f"research_report_{topic.replace(' ', '_')[:30]}.txt"
-        with open(filename, "w") as f:
-            f.write(report)
+        try:
+            await asyncio.to_thread(_save_report, filename, report)
+        except BaseException:
+            # Nothing will await the rewrite now; stop it instead of leaking the call
+            script_task.cancel()
+            raise
             
         print(f"📄 Full report saved to {filename}")
         print(f"📊 Report length: {len(report)} characters")
 
         # Create podcast from report
         print("\n🎙️ Converting report to podcast format...")
-        speaker = Speaker()
         audio_path = await speaker.create_podcast_from_report(
             report=report,
             topic_name=topic,
-            play_audio=True  # We will ask user if they want to play it later
+            play_audio=True,  # We will ask user if they want to play it later
+            script_task=script_task
         )
         
         print(f"🎵 Podcast created at: {audio_path}")
@@ -152,4 +172,10 @@ async def main():
         print(f"❌ System error: {str(e)}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # uvloop is an optional, faster event loop (not available on Windows)
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
\ No newline at end of file
@@ -1,19 +1,106 @@
-import openai
-import os
-from typing import List
-from dotenv import load_dotenv
+import asyncio
+from datetime import datetime
+from functools import lru_cache
+from typing import AsyncIterator, List, Optional, Set
+from urllib.parse import urlparse
 from agent import TaskResult
+from clients import get_openai
+from llm_cache import LLMResponseCache, cached_chat_completion
+from _hot import ReportStats, compute_stats
+
+@lru_cache(maxsize=4096)
+def _domain(url: str) -> str:
+    """Display domain for a source URL (cached: sub-agents often cite the same sites)."""
+    try:
+        return urlparse(url).netloc or url
+    except ValueError:
+        return url
+
+# Per-result templates. Kept unindented: leading whitespace would only add
+# tokens to the synthesis prompt.
+_FINDING_SECTION_TEMPLATE = """Research Finding #{index}:
+Focus Area: {description}
+Confidence Level: {confidence:.2f}
+
+Key Insights:
+{findings}
+
+Sources Referenced:
+{sources}
+"""
+
+_FALLBACK_SECTION_TEMPLATE = """### Finding #{index}: {description}
+**Confidence Score:** {confidence:.2f}
+
+{findings}
+
+**Sources:** {sources}
+
+---
+"""
+
+# Static instructions for the final report. Kept free of per-call data so the
+# prompt prefix can be served from OpenAI's automatic prompt cache.
+SYSTEM_PROMPT_REPORTER = """You are an expert research analyst who synthesizes complex information into clear, actionable reports. You are thorough, objective, and evidence-based in your analysis.
+
+You will be given a research topic, a research brief, findings from research sub-agents, and research quality metrics. Write a comprehensive research report that:
+
+1. **EXECUTIVE SUMMARY**: Provide a clear, concise overview of key findings (2-3 paragraphs)
+
+2. **DETAILED ANALYSIS**:
+   - Synthesize all research findings into coherent insights
+   - Address the specific requirements in the research brief
+   - Present multiple perspectives where available
+   - Highlight key data points and statistics
+   - Identify patterns and trends across sources
+
+3. **KEY FINDINGS**: List the most important discoveries and insights
+
+4. **IMPLICATIONS & RECOMMENDATIONS**:
+   - What do these findings mean?
+   - Actionable recommendations based on the research
+   - Future considerations or areas for further investigation
+
+5. **RESEARCH LIMITATIONS**:
+   - Acknowledge gaps in the research
+   - Note areas where information was limited or conflicting
+   - Suggest areas for additional research
+
+6. **SOURCES & METHODOLOGY**:
+   - Brief overview of research methodology
+   - Note on source reliability and diversity
+
+FORMATTING REQUIREMENTS:
+- Use clear headings and subheadings
+- Write in professional, academic tone
+- Ensure logical flow between sections
+- Include specific citations to source domains when referencing data
+- Aim for 800-1200 words total
+- Be objective and evidence-based
+
+IMPORTANT: Base your analysis strictly on the provided research findings. Do not add information not present in the research data. If information is limited, acknowledge this explicitly.
+"""
+
+_REPORTER_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT_REPORTER}
+
+# Put on a paragraph_queue when streaming fails partway: consumers should
+# discard the paragraphs received so far; the fallback report's paragraphs follow
+REPORT_RESET = object()
 
 class Reporter:
-    def __init__(self, model_name: str = "gpt-4o-mini"):
+    def __init__(self, model_name: str = "gpt-4o-mini", cache: LLMResponseCache = None):
         self.model_name = model_name
         
-        # Initialize OpenAI client
-        load_dotenv()
-        self.client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # Shared OpenAI client (one connection pool for all agents)
+        self.client = get_openai()
+        
+        # Identical report requests are answered from disk
+        self.cache = cache if cache is not None else LLMResponseCache()
     
     async def generate_report(self, topic: str, results: List[TaskResult], 
-                            research_brief: str = None) -> str:
+                            research_brief: str = None,
+                            paragraph_queue: Optional[asyncio.Queue] = None,
+                            findings_sections: Optional[List[str]] = None) -> str:
         """
         Generate a comprehensive report using LLM synthesis.
         
@@ -21,191 +108,191 @@ class Reporter:
             topic: The main research topic
             results: List of TaskResult objects from sub-agents
             research_brief: Optional detailed research brief/requirements
+            paragraph_queue: Optional queue that receives each report paragraph
+                as soon as the model has streamed it, followed by None when done.
+                If synthesis fails partway, REPORT_RESET and then the fallback
+                report's paragraphs are queued instead.
+            findings_sections: Pre-formatted finding sections (see stream_generate_report)
         """
-        if not results:
-            return await self._generate_empty_report(topic, research_brief)
-        
-        # Prepare research findings for LLM synthesis
-        synthesized_findings = self._prepare_findings_for_synthesis(results)
+        # One timestamp per report, shared by whichever path builds it
+        generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")
+        try:
+            if not results:
+                return self._generate_empty_report(topic, research_brief, generated_at)
+            
+            # Prepare research findings for LLM synthesis
+            if findings_sections is None:
+                synthesized_findings = self._prepare_findings_for_synthesis(results)
+            else:
+                synthesized_findings = self._join_finding_sections(findings_sections)
+            stats = self._compute_stats(results)
+            
+            # Generate the final report using LLM
+            final_report = await self._synthesize_final_report(
+                topic, research_brief, synthesized_findings, results, stats, generated_at,
+                paragraph_queue
+            )
+            
+            return final_report
+        finally:
+            if paragraph_queue is not None:
+                paragraph_queue.put_nowait(None)
+    
+    async def stream_generate_report(self, topic: str, result_iter: AsyncIterator[TaskResult],
+                                     research_brief: str = None,
+                                     paragraph_queue: Optional[asyncio.Queue] = None) -> str:
+        """
+        Generate a report from results that are still arriving.
         
-        # Generate the final report using LLM
-        final_report = await self._synthesize_final_report(
-            topic, research_brief, synthesized_findings, results
-        )
+        Each finding section is formatted as soon as its TaskResult lands, so
+        only the synthesis call is left once the slowest sub-agent finishes.
+        Accepts the same arguments as generate_report, except that results
+        come from an async iterator (e.g. Supervisor.delegate_tasks_as_completed).
+        """
+        results = []
+        findings_sections = []
+        seen_sources = set()
+        async for result in result_iter:
+            results.append(result)
+            section = self._format_finding_section(len(results), result, seen_sources)
+            if section:
+                findings_sections.append(section)
         
-        return final_report
+        return await self.generate_report(topic, results, research_brief, paragraph_queue,
+                                          findings_sections=findings_sections)
     
     def _prepare_findings_for_synthesis(self, results: List[TaskResult]) -> str:
         """
         Organize and structure research findings for LLM consumption.
         """
         findings_sections = []
+        seen_sources = set()
         
         for i, result in enumerate(results, 1):
-            # Only include completed results with substantial findings
-            if result.status == "completed" and result.findings:
-                section = f"""
-                Research Finding #{i}:
-                Focus Area: {result.task_description}
-                Confidence Level: {result.confidence_score:.2f}
-                
-                Key Insights:
-                {result.findings}
-                
-                Sources Referenced:
-                {self._format_sources(result.sources)}
-                
-                ---
-                """
+            section = self._format_finding_section(i, result, seen_sources)
+            if section:
                 findings_sections.append(section)
         
+        return self._join_finding_sections(findings_sections)
+    
+    def _format_finding_section(self, index: int, result: TaskResult,
+                                seen_sources: Optional[Set[str]] = None) -> Optional[str]:
+        """
+        Format one TaskResult for the synthesis prompt (None if it has nothing to add).
+        Sources already in seen_sources were listed by an earlier section and are
+        left out; newly listed sources are added to it.
+        """
+        # Only include completed results with substantial findings
+        if result.status != "completed" or not result.findings:
+            return None
+        
+        sources = result.sources
+        if seen_sources is not None:
+            sources = [source for source in dict.fromkeys(result.sources) if source not in seen_sources]
+            seen_sources.update(sources)
+        
+        if result.sources and not sources:
+            formatted_sources = "• Same sources as earlier findings"
+        else:
+            formatted_sources = self._format_sources(sources)
+        
+        return _FINDING_SECTION_TEMPLATE.format(
+            index=index,
+            description=result.task_description,
+            confidence=result.confidence_score,
+            findings=result.findings,
+            sources=formatted_sources
+        )
+    
+    def _join_finding_sections(self, findings_sections: List[str]) -> str:
         if not findings_sections:
             return "No substantial research findings were collected from sub-agents."
         
-        return "\n".join(findings_sections)
+        return "\n---\n".join(findings_sections)
     
     def _format_sources(self, sources: List[str]) -> str:
         """Format source URLs in a clean, readable way."""
         if not sources:
             return "• No sources provided"
         
-        formatted_sources = []
-        for i, source in enumerate(sources[:5], 1):  # Limit to top 5 sources
-            # Extract domain for cleaner display
-            try:
-                from urllib.parse import urlparse
-                domain = urlparse(source).netloc
-                formatted_sources.append(f"• [{domain}]({source})")
-            except:
-                formatted_sources.append(f"• {source}")
+        formatted_sources = [f"• [{_domain(source)}]({source})"
+                             for source in sources[:5]]  # Limit to top 5 sources
         
         return "\n".join(formatted_sources)
     
     async def _synthesize_final_report(self, topic: str, research_brief: str, 
-                                     synthesized_findings: str, results: List[TaskResult]) -> str:
+                                     synthesized_findings: str, results: List[TaskResult],
+                                     stats: ReportStats, generated_at: str,
+                                     paragraph_queue: Optional[asyncio.Queue] = None) -> str:
         """
         Use LLM to create final comprehensive report.
+        The completion is streamed; paragraphs are pushed to paragraph_queue as they arrive.
+        On failure the queue gets REPORT_RESET followed by the fallback report.
         """
-        # Calculate overall research quality metrics
-        avg_confidence = self._calculate_average_confidence(results)
-        total_sources = sum(len(result.sources) for result in results)
-        completed_tasks = len([r for r in results if r.status == "completed"])
-        
-        # Construct the synthesis prompt
-        synthesis_prompt = f"""
-        You are an expert research analyst tasked with writing a comprehensive research report.
-        
-        RESEARCH TOPIC: "{topic}"
-        
-        RESEARCH BRIEF: {research_brief or "Provide a comprehensive analysis of the given topic."}
-        
-        RESEARCH FINDINGS FROM SUB-AGENTS:
-        {synthesized_findings}
-        
-        RESEARCH QUALITY METRICS:
-        - Average Confidence Score: {avg_confidence:.2f}/1.0
-        - Total Sources Consulted: {total_sources}
-        - Research Tasks Completed: {completed_tasks}/{len(results)}
-        
-        Please write a comprehensive research report that:
-        
-        1. **EXECUTIVE SUMMARY**: Provide a clear, concise overview of key findings (2-3 paragraphs)
-        
-        2. **DETAILED ANALYSIS**: 
-           - Synthesize all research findings into coherent insights
-           - Address the specific requirements in the research brief
-           - Present multiple perspectives where available
-           - Highlight key data points and statistics
-           - Identify patterns and trends across sources
-        
-        3. **KEY FINDINGS**: List the most important discoveries and insights
-        
-        4. **IMPLICATIONS & RECOMMENDATIONS**: 
-           - What do these findings mean?
-           - Actionable recommendations based on the research
-           - Future considerations or areas for further investigation
-        
-        5. **RESEARCH LIMITATIONS**: 
-           - Acknowledge gaps in the research
-           - Note areas where information was limited or conflicting
-           - Suggest areas for additional research
-        
-        6. **SOURCES & METHODOLOGY**: 
-           - Brief overview of research methodology
-           - Note on source reliability and diversity
-        
-        FORMATTING REQUIREMENTS:
-        - Use clear headings and subheadings
-        - Write in professional, academic tone
-        - Ensure logical flow between sections
-        - Include specific citations to source domains when referencing data
-        - Aim for 800-1200 words total
-        - Be objective and evidence-based
-        
-        IMPORTANT: Base your analysis strictly on the provided research findings. Do not add information not present in the research data. If information is limited, acknowledge this explicitly.
-        """
+        # Only the per-report data goes in the user message; the static
+        # instructions live in SYSTEM_PROMPT_REPORTER so the request prefix
+        # stays byte-identical across calls (OpenAI prompt caching).
+        synthesis_prompt = f"""RESEARCH TOPIC: "{topic}"
+
+RESEARCH BRIEF: {research_brief or "Provide a comprehensive analysis of the given topic."}
+
+RESEARCH FINDINGS FROM SUB-AGENTS:
+{synthesized_findings}
+
+RESEARCH QUALITY METRICS:
+- Average Confidence Score: {stats.avg_confidence:.2f}/1.0
+- Total Sources Consulted: {stats.total_sources}
+- Research Tasks Completed: {stats.completed}/{stats.total}
+"""
         
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model_name,
+            synthesized_report = await cached_chat_completion(
+                self.client,
+                self.cache,
                 messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are an expert research analyst who synthesizes complex information into clear, actionable reports. You are thorough, objective, and evidence-based in your analysis."
-                    },
-                    {
-                        "role": "user", 
-                        "content": synthesis_prompt
-                    }
+                    _REPORTER_SYSTEM_MESSAGE,
+                    {"role": "user", "content": synthesis_prompt}
                 ],
+                model=self.model_name,
                 temperature=0.3,  # Lower temperature for more consistent, factual output
-                max_tokens=2000   # Allow for comprehensive reports
+                max_tokens=2000,  # Allow for comprehensive reports
+                stream=True,
+                on_paragraph=paragraph_queue.put_nowait if paragraph_queue is not None else None
             )
             
-            synthesized_report = response.choices[0].message.content
-            
             # Add metadata footer
-            metadata_footer = self._generate_metadata_footer(results)
+            metadata_footer = self._generate_metadata_footer(stats, generated_at)
             
             return f"{synthesized_report}\n\n{metadata_footer}"
             
         except Exception as e:
             print(f"Error generating LLM report: {e}")
             # Fallback to basic structured report
-            return await self._generate_fallback_report(topic, results)
+            fallback_report = self._generate_fallback_report(topic, results, stats, generated_at)
+            if paragraph_queue is not None:
+                # Replace whatever was streamed before the failure
+                paragraph_queue.put_nowait(REPORT_RESET)
+                for paragraph in fallback_report.split("\n\n"):
+                    if paragraph.strip():
+                        paragraph_queue.put_nowait(paragraph)
+            return fallback_report
     
-    def _calculate_average_confidence(self, results: List[TaskResult]) -> float:
-        """Calculate average confidence score across all results."""
-        if not results:
-            return 0.0
-        
-        valid_results = [r for r in results if r.confidence_score is not None]
-        if not valid_results:
-            return 0.0
-        
-        return sum(r.confidence_score for r in valid_results) / len(valid_results)
+    def _compute_stats(self, results: List[TaskResult]) -> ReportStats:
+        """Collect task, source and confidence metrics in a single pass over results."""
+        return compute_stats(results)
     
-    def _generate_metadata_footer(self, results: List[TaskResult]) -> str:
+    def _generate_metadata_footer(self, stats: ReportStats, generated_at: str) -> str:
         """Generate metadata footer with research statistics."""
-        total_sources = sum(len(result.sources) for result in results)
-        completed_tasks = len([r for r in results if r.status == "completed"])
-        avg_confidence = self._calculate_average_confidence(results)
-        
         return f"""
         ---
         **Research Metadata**
-        - Research Tasks Completed: {completed_tasks}/{len(results)}
-        - Total Sources Analyzed: {total_sources}
-        - Average Confidence Score: {avg_confidence:.2f}/1.0
-        - Report Generated: {self._get_current_timestamp()}
+        - Research Tasks Completed: {stats.completed}/{stats.total}
+        - Total Sources Analyzed: {stats.total_sources}
+        - Average Confidence Score: {stats.avg_confidence:.2f}/1.0
+        - Report Generated: {generated_at}
         """
     
-    def _get_current_timestamp(self) -> str:
-        """Get current timestamp for report metadata."""
-        from datetime import datetime
-        return datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")
-    
-    async def _generate_empty_report(self, topic: str, research_brief: str = None) -> str:
+    def _generate_empty_report(self, topic: str, research_brief: str, generated_at: str) -> str:
         """Generate report when no research results are available."""
         return f"""
         # Research Report: {topic}
@@ -228,10 +315,11 @@ class Reporter:
         **Research Metadata**
         - Research Tasks Completed: 0/0
         - Total Sources Analyzed: 0
-        - Report Generated: {self._get_current_timestamp()}
+        - Report Generated: {generated_at}
         """
     
-    async def _generate_fallback_report(self, topic: str, results: List[TaskResult]) -> str:
+    def _generate_fallback_report(self, topic: str, results: List[TaskResult],
+                                  stats: ReportStats, generated_at: str) -> str:
         """Generate basic structured report when LLM synthesis fails."""
         report_sections = [
             f"# Research Report: {topic}\n",
@@ -242,20 +330,16 @@ class Reporter:
         
         for i, result in enumerate(results, 1):
             if result.status == "completed":
-                section = f"""
-                ### Finding #{i}: {result.task_description}
-                **Confidence Score:** {result.confidence_score:.2f}
-                
-                {result.findings}
-                
-                **Sources:** {', '.join(result.sources[:3]) if result.sources else 'No sources available'}
-                
-                ---
-                """
-                report_sections.append(section)
+                report_sections.append(_FALLBACK_SECTION_TEMPLATE.format(
+                    index=i,
+                    description=result.task_description,
+                    confidence=result.confidence_score,
+                    findings=result.findings,
+                    sources=', '.join(result.sources[:3]) if result.sources else 'No sources available'
+                ))
         
         # Add metadata
-        report_sections.append(self._generate_metadata_footer(results))
+        report_sections.append(self._generate_metadata_footer(stats, generated_at))
         
         return "\n".join(report_sections)
     
@@ -267,11 +351,12 @@ class Reporter:
             return f"No research findings available for '{topic}' yet."
         
         completed = [r for r in results if r.status == "completed"]
+        stats = self._compute_stats(completed)
         summary_parts = [
             f"Research Progress for '{topic}':",
-            f"• Completed Tasks: {len(completed)}/{len(results)}",
-            f"• Average Confidence: {self._calculate_average_confidence(completed):.2f}",
-            f"• Total Sources: {sum(len(r.sources) for r in completed)}",
+            f"• Completed Tasks: {stats.completed}/{len(results)}",
+            f"• Average Confidence: {stats.avg_confidence:.2f}",
+            f"• Total Sources: {stats.total_sources}",
             "\nKey Findings:"
         ]
         
@@ -1,12 +1,27 @@
 import os
-import re
-import time
+import asyncio
 import shutil
 import platform
 import subprocess
 from datetime import datetime
-from dotenv import load_dotenv
-from openai import AsyncOpenAI, OpenAI
+from typing import Awaitable, Optional
+from clients import get_openai, openai_retry
+from llm_cache import LLMResponseCache, cached_chat_completion
+from _hot import split_into_chunks
+
+# Scriptwriter instructions, sent verbatim with every rewrite request.
+SYSTEM_PROMPT_SCRIPTWRITER = """You are an expert podcast scriptwriter. Your task is to transform a formal, dense research report into an engaging, conversational, and easy-to-understand podcast script.
+
+Follow these instructions:
+- Start with a catchy and welcoming introduction.
+- End with a clear and concise outro, thanking the listener.
+- Convert complex data, findings, and recommendations into a natural, narrative format. Use analogies where helpful.
+- Do not just summarize. Rewrite and rephrase the content to be spoken.
+- Keep the core facts, data, and insights from the original report.
+- Structure the script with clear sections, but use conversational transitions instead of formal headers.
+"""
+
+_SCRIPTWRITER_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT_SCRIPTWRITER}
 
 # --- Main Speaker Class ---
 
@@ -16,21 +31,23 @@ class Speaker:
     scripting and text-to-speech.
     """
     def __init__(self):
-        load_dotenv()
         openai_api_key = os.getenv("OPENAI_API_KEY")
         if not openai_api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
         
-        # CHANGED: Initialize the async client
-        self.client = AsyncOpenAI(api_key=openai_api_key) 
+        # Shared async client (one connection pool for all agents)
+        self.client = get_openai()
+        self.cache = LLMResponseCache()  # Re-runs on the same report reuse the script
         
         self.voice_name = "nova"  # OpenAI voices: alloy, echo, fable, onyx, nova, shimmer
         self.output_directory = "podcasts"
         self.max_chunk_size = 4000  # OpenAI TTS character limit
+        self.max_concurrent_tts = 5  # Parallel TTS requests (rate-limit guard)
         
         os.makedirs(self.output_directory, exist_ok=True)
 
-    async def create_podcast_from_report(self, report: str, topic_name: str, play_audio: bool = False):
+    async def create_podcast_from_report(self, report: str, topic_name: str, play_audio: bool = False,
+                                         script_task: Optional[Awaitable[str]] = None):
         """
         Main function to convert a report into a multi-part podcast.
 
@@ -42,6 +59,9 @@ class Speaker:
             report (str): The full research report text.
             topic_name (str): The main topic, used for naming files and folders.
             play_audio (bool): Whether to play the first audio chunk after creation.
+            script_task (Awaitable[str], optional): An already-running script rewrite
+                (e.g. started while the report was being saved). If omitted, the
+                rewrite is performed here.
         
         Returns:
             str: The path to the directory containing the podcast audio files.
@@ -51,7 +71,9 @@ class Speaker:
         # 1. Edit the report into a podcast script using an AI model
         print("✍️  Rewriting report into a podcast script with GPT-4o-mini...")
         try:
-            podcast_script = await self._edit_report_for_podcast(report, topic_name)
+            if script_task is None:
+                script_task = self._edit_report_for_podcast(report, topic_name)
+            podcast_script = await script_task
         except Exception as e:
             print(f"❌ Error editing report with AI: {e}")
             return None
@@ -59,7 +81,7 @@ class Speaker:
         # 2. Convert the generated script to audio chunks
         print("🗣️  Converting script to audio...")
         try:
-            output_path = self._convert_text_to_audio(podcast_script, topic_name)
+            output_path = await self._convert_text_to_audio(podcast_script, topic_name)
             print(f"✅ Successfully created podcast files in: {output_path}")
         except Exception as e:
             print(f"❌ Error converting text to audio: {e}")
@@ -79,34 +101,23 @@ class Speaker:
         """
         Uses a chat model to rewrite a formal report into an engaging podcast script.
         """
-        system_prompt = """
-        You are an expert podcast scriptwriter. Your task is to transform a formal, dense research report into an engaging, conversational, and easy-to-understand podcast script.
-
-        Follow these instructions:
-        - Start with a catchy and welcoming introduction.
-        - End with a clear and concise outro, thanking the listener.
-        - Convert complex data, findings, and recommendations into a natural, narrative format. Use analogies where helpful.
-        - Do not just summarize. Rewrite and rephrase the content to be spoken.
-        - Keep the core facts, data, and insights from the original report.
-        - Structure the script with clear sections, but use conversational transitions instead of formal headers.
-        """
-        
         user_prompt = f"Please rewrite the following research report on the topic '{topic_name}' into a podcast script:\n\n--- REPORT START ---\n{report}\n--- REPORT END ---"
 
-        # This 'await' now works correctly with the AsyncOpenAI client
-        response = await self.client.chat.completions.create(
-            model="gpt-4o-mini",
+        return await cached_chat_completion(
+            self.client,
+            self.cache,
             messages=[
-                {"role": "system", "content": system_prompt},
+                _SCRIPTWRITER_SYSTEM_MESSAGE,
                 {"role": "user", "content": user_prompt},
             ],
+            model="gpt-4o-mini",
             temperature=0.7,
         )
-        return response.choices[0].message.content
 
-    def _convert_text_to_audio(self, text: str, topic_name: str) -> str:
+    async def _convert_text_to_audio(self, text: str, topic_name: str) -> str:
         """
         Converts a long string of text into multiple, numbered MP3 files.
+        All parts are requested concurrently, bounded by max_concurrent_tts.
         """
         # Create a unique directory for this podcast's audio chunks
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -117,51 +128,39 @@ class Speaker:
         chunks = self._split_into_chunks(text, self.max_chunk_size)
         print(f"   > Script split into {len(chunks)} audio parts.")
 
-        # Note: _generate_speech is synchronous, which is fine to call from an async function
-        for i, chunk in enumerate(chunks):
-            chunk_filename = os.path.join(podcast_dir, f"part_{i+1}.mp3")
-            print(f"   > Generating {chunk_filename}...")
-            try:
-                self._generate_speech(chunk, chunk_filename)
-            except Exception as e:
-                print(f"   > ❗ Failed to generate part {i+1}: {e}")
+        # The OpenAI Batch API does not accept /v1/audio/speech, so parts are
+        # rendered with bounded concurrent requests instead of a batch job.
+        semaphore = asyncio.Semaphore(self.max_concurrent_tts)
+
+        async def generate_part(index: int, chunk: str):
+            chunk_filename = os.path.join(podcast_dir, f"part_{index+1}.mp3")
+            async with semaphore:
+                print(f"   > Generating {chunk_filename}...")
+                await self._generate_speech(chunk, chunk_filename)
+
+        results = await asyncio.gather(
+            *(generate_part(i, chunk) for i, chunk in enumerate(chunks)),
+            return_exceptions=True
+        )
+        for i, result in enumerate(results):
+            if isinstance(result, Exception):
+                print(f"   > ❗ Failed to generate part {i+1}: {result}")
         
         return podcast_dir
 
-    def _generate_speech(self, text: str, output_file: str):
+    @openai_retry
+    async def _generate_speech(self, text: str, output_file: str):
         """Generates a single MP3 file from a text chunk using OpenAI TTS."""
-        try:
-            # The standard client can be used for synchronous operations like TTS
-            sync_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            response = sync_client.audio.speech.create(
-                model="tts-1",
-                voice=self.voice_name,
-                input=text,
-            )
-            response.stream_to_file(output_file)
-            time.sleep(1)  # Small delay to respect API rate limits
-        except Exception as e:
-            # Propagate the error to be handled by the calling function
-            raise e
+        async with self.client.audio.speech.with_streaming_response.create(
+            model="tts-1",
+            voice=self.voice_name,
+            input=text,
+        ) as response:
+            await response.stream_to_file(output_file)
 
     def _split_into_chunks(self, text: str, max_length: int) -> list[str]:
         """Splits text into chunks by sentences, respecting the max_length."""
-        chunks = []
-        sentences = re.split(r'(?<=[.!?])\s+', text.replace("\n", " "))
-        
-        current_chunk = ""
-        for sentence in sentences:
-            if not sentence: continue
-            if len(current_chunk) + len(sentence) + 1 > max_length and current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = sentence + " "
-            else:
-                current_chunk += sentence + " "
-        
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-            
-        return chunks
+        return split_into_chunks(text, max_length)
 
     def set_voice(self, voice_name: str = 'nova'):
         """Changes the TTS voice."""
@@ -173,7 +172,7 @@ class Speaker:
             print(f"Invalid voice name. Using '{self.voice_name}'.")
 
     def play_audio(self, audio_path: str):
-        """Plays an audio file using the system's default player."""
+        """Starts playing an audio file with the system's default player, in the background."""
         if not os.path.exists(audio_path):
             print(f"Error: Audio file not found at {audio_path}")
             return
@@ -182,11 +181,13 @@ class Speaker:
         system = platform.system()
         try:
             if system == "Darwin":  # macOS
-                subprocess.run(["afplay", audio_path], check=True)
+                subprocess.Popen(["afplay", audio_path],
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             elif system == "Windows":
-                os.startfile(audio_path)
+                os.startfile(audio_path)  # Already returns without waiting
             elif system == "Linux":
-                subprocess.run(["xdg-open", audio_path], check=True)
+                subprocess.Popen(["xdg-open", audio_path],
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             else:
                 print(f"Unsupported OS '{system}'. Please play file manually.")
         except Exception as e:
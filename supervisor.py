@@ -1,232 +1,637 @@
-import pytest
 import asyncio
-from typing import List, Dict, Any, Tuple
+import hashlib
+import logging
+import orjson
+import string
+from collections import defaultdict
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from agent import BaseAgent, TaskResult
-import openai
-import os
-from dotenv import load_dotenv
+from clients import RateLimiter, get_openai
+from llm_cache import LLMResponseCache, cached_chat_completion
+
+logger = logging.getLogger(__name__)
+
+_PLANNER_SYSTEM_MESSAGE = {"role": "system", "content": "You are a research planning expert. Respond ONLY with valid JSON. No additional text."}
+_STRATEGIST_SYSTEM_MESSAGE = {"role": "system", "content": "You are a research strategy expert. Respond ONLY with valid JSON. No additional text."}
+
+_BATCHED_SUBTOPIC_SYSTEM_PROMPT = (
+    "You are a research strategy expert. For each item, create one focused research "
+    "sub-topic covering that aspect of the topic. Each result is an object with "
+    '"query", "description", "context", "priority" and "rationale" keys. '
+    "Respond ONLY with valid JSON. No additional text."
+)
+
+# Planner prompts. string.Template keeps the JSON braces literal. The static
+# instructions and schema come first and the topic/context last, so repeated
+# calls share a byte-identical prefix for OpenAI's prompt caching.
+# Follow-up questions and complexity analysis for a bare topic, in one call
+_PREFLIGHT_TEMPLATE = string.Template("""For the research topic given at the end:
+
+1. Generate exactly 3 follow-up questions that would help gather more context and clarify the topic.
+2. Analyze the topic for complexity and research strategy:
+   - What are the main aspects/dimensions of this topic?
+   - How many sub-research areas would be optimal (between 1-10)?
+   - What type of research approach would work best?
+
+IMPORTANT: Respond ONLY with valid JSON in this exact format:
+{
+    "questions": [
+        "First follow-up question?",
+        "Second follow-up question?",
+        "Third follow-up question?"
+    ],
+    "explanation": "Brief explanation of why these questions are important for this research",
+    "complexity": {
+        "is_complex": true,
+        "main_aspects": ["aspect1", "aspect2"],
+        "recommended_subtopics": <integer between 1 and 10>,
+        "research_approach": "analytical",
+        "reasoning": "explanation here"
+    }
+}
+---
+Research topic: "$topic"
+""")
+
+_COMPLEXITY_TEMPLATE = string.Template("""Analyze the research topic given at the end for complexity and research strategy.
+
+Please evaluate:
+1. What are the main aspects/dimensions of this topic?
+2. How many sub-research areas would be optimal (between 1-10)?
+3. What type of research approach would work best?
+
+IMPORTANT: Respond ONLY with valid JSON in this exact format:
+{
+    "is_complex": true,
+    "main_aspects": ["aspect1", "aspect2"],
+    "recommended_subtopics": <integer between 1 and 10>,
+    "research_approach": "analytical",
+    "reasoning": "explanation here"
+}
+---
+Topic: "$topic"$context_text
+""")
+
+_SUBTOPIC_TEMPLATE = string.Template("""Create focused research sub-topics for the research topic given at the end, covering its main aspects with the given research approach.
+
+IMPORTANT: Respond ONLY with valid JSON in this exact format:
+{
+    "subtopics": [
+        {
+            "query": "specific search terms",
+            "description": "what this sub-research focuses on",
+            "context": "specific angle or focus area",
+            "priority": "high",
+            "rationale": "why this subtopic is important"
+        }
+    ]
+}
+---
+Number of sub-topics: $num_subtopics
+Topic: "$topic"
+Main aspects to cover: $main_aspects
+Research approach: $research_approach$context_text
+""")
+
+_TASK_DEFAULTS = {"type": "web_search", "priority": "medium"}  # Default to web search for now
+
+_FOLLOW_UP_INTRO = "To better focus the research, please consider these follow-up questions:\n\n"
+
+def _is_complexity_analysis(value: Any) -> bool:
+    """True if value has the shape the planner relies on for a complexity analysis."""
+    return (isinstance(value, dict) and "is_complex" in value
+            and isinstance(value.get("main_aspects", []), list))
+
+def _numbered_lines(items: List[str]) -> str:
+    """Number items from 1, one per line, each line ending in a newline."""
+    return "".join(f"{i}. {item}\n" for i, item in enumerate(items, 1))
 
 class Supervisor(BaseAgent):
     def __init__(self):
-        super().__init__(agent_id="supervisor", model_name="gpt-o4-mini")
+        super().__init__(agent_id="supervisor", model_name="gpt-4o-mini")
         self.sub_agents = []
+        self._capability_index: Dict[str, List[BaseAgent]] = {}  # task_type -> capable agents
+        self._agent_capabilities: Tuple[Tuple[str, ...], ...] = ()  # Snapshot for get_research_summary
+        self._preflight_memo: Dict[str, asyncio.Future] = {}  # topic -> combined planner reply
         self.task_queue = []
         self.max_parallel_tasks = 10
         
-        # Add this - Initialize OpenAI client
-        load_dotenv()
-        self.client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # Offline mode: plan_research_batch goes through the OpenAI Batch API
+        # (half price, separate rate limits, up to 24h turnaround)
+        self.use_batch_api = False
+        self.batch_poll_interval = 30  # seconds between batch status checks
+        
+        # Shared OpenAI client (one connection pool for all agents)
+        self.client = get_openai()
+        self.cache = LLMResponseCache()  # Planner replies for repeated prompts
+        self._rate_limiter = RateLimiter(max_rate=500, time_period=60)  # Planner requests per minute
     
     def add_sub_agent(self, agent: BaseAgent):
         """Add a sub-agent to the supervisor."""
         self.sub_agents.append(agent)
+        self._agent_capabilities += (tuple(agent.capabilities),)
+        for task_type, agents in self._capability_index.items():
+            if agent.can_handle_task(task_type):
+                agents.append(agent)
+    
+    async def _chat_json(self, messages: List[Dict[str, str]], model: str = None,
+                         temperature: float = 0.1) -> Dict[str, Any]:
+        """
+        Single entry point for the planner's JSON prompts; returns the parsed reply.
+        Uses JSON mode so the model always returns a bare JSON object, and a low
+        temperature for consistent output. Replies are cached on disk, so
+        repeating a prompt skips the API call. Transient errors are retried with
+        backoff, and requests are paced by a token bucket that tracks the
+        x-ratelimit headers.
+        """
+        model = model or self.model_name
+        key = self.cache.make_key(model, temperature, messages)
+        cached = await self.cache.aget(key)
+        if cached is not None:
+            return orjson.loads(cached)
+        
+        reply = await cached_chat_completion(self.client, None, messages, model, temperature,
+                                             response_format={"type": "json_object"},
+                                             rate_limiter=self._rate_limiter)
+        try:
+            data = orjson.loads(reply)
+        except orjson.JSONDecodeError:
+            logger.debug("Raw response: %s", reply)
+            raise
+        await self.cache.aset(key, reply)
+        return data
+    
+    async def _warm_up_agents(self):
+        """Run every sub-agent's warm-up hook concurrently; failures are non-fatal."""
+        results = await asyncio.gather(*(agent.warm_up() for agent in self.sub_agents),
+                                       return_exceptions=True)
+        for agent, result in zip(self.sub_agents, results):
+            if isinstance(result, Exception):
+                logger.warning("Warm-up failed for agent %s: %s", agent.agent_id, result)
+    
+    async def _close_agents(self):
+        """Run every sub-agent's aclose hook concurrently; failures are non-fatal."""
+        results = await asyncio.gather(*(agent.aclose() for agent in self.sub_agents),
+                                       return_exceptions=True)
+        for agent, result in zip(self.sub_agents, results):
+            if isinstance(result, Exception):
+                logger.warning("Closing agent %s failed: %s", agent.agent_id, result)
     
-    @pytest.mark.asyncio
     async def plan_research(self, research_topic: str, additional_context: str = "") -> List[Dict[str, Any]]:
         """
         Break down research topic into independent sub-tasks.
         Uses LLM to analyze complexity and create parallel research paths.
+        
+        With additional_context (typically the user's answers to
+        generate_follow_up_questions), the complexity analysis from that
+        earlier call is reused: the main aspects and subtopic count then come
+        from the bare topic, while the answers still go into every subtopic
+        prompt. Without a finished preflight reply for the topic, the
+        complexity analysis is requested with the context included.
         """
         # If additional_context is provided, use it directly
-        # Otherwise, generate follow-up questions to gather context
+        # Otherwise, generate follow-up questions to gather context. Both
+        # helpers read the same memoized _preflight reply, so this is a
+        # single LLM call.
+        complexity_analysis = None
         if not additional_context:
-            _, question_message = await self.generate_follow_up_questions(research_topic)
+            (_, question_message), complexity_analysis = await asyncio.gather(
+                self.generate_follow_up_questions(research_topic),
+                self.analyze_topic_complexity(research_topic)
+            )
             enhanced_context = f"{research_topic}\n\nAdditional context/questions to consider:\n{question_message}"
         else:
             enhanced_context = f"{research_topic}\n\n{additional_context}"
+            # The context usually answers questions from generate_follow_up_questions;
+            # that same call already analyzed the topic's complexity. None (cold
+            # memo) makes analyze_and_break_down_topic ask with enhanced_context.
+            complexity_analysis = self._memoized_complexity(research_topic)
         
-        sub_topics = await self.analyze_and_break_down_topic(research_topic, enhanced_context)
-        tasks = []
-        for i, sub_topic in enumerate(sub_topics):
-            task = {
-                "task_id": f"research_task_{i+1}",
-                "type": "web_search",  # Default to web search for now
-                "query": sub_topic["query"],
-                "description": sub_topic["description"],
-                "context": sub_topic["context"],
-                "priority": sub_topic.get("priority", "medium"),
-                "sources": []
-            }
-            tasks.append(task)
+        sub_topics = await self.analyze_and_break_down_topic(research_topic, enhanced_context,
+                                                             complexity_analysis)
+        tasks = self._build_tasks(sub_topics)
         
         self.task_queue = tasks
         return tasks
     
-    async def generate_follow_up_questions(self, research_topic: str) -> Tuple[List[str], str]:
+    def _build_tasks(self, sub_topics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Turn planned sub-topics into web_search task dicts."""
+        return [{
+            "task_id": f"research_task_{i}",
+            **_TASK_DEFAULTS,
+            "query": sub_topic["query"],
+            "description": sub_topic["description"],
+            "context": sub_topic["context"],
+            "priority": sub_topic.get("priority", _TASK_DEFAULTS["priority"]),
+            "sources": []  # Fresh list per task
+        } for i, sub_topic in enumerate(sub_topics, 1)]
+    
+    async def plan_research_batch(self, research_topics: List[str]) -> Dict[str, List[Dict[str, Any]]]:
         """
-        Generate 3 follow-up questions to gather more context about the research topic.
-        Returns both the list of questions and a formatted message containing the questions.
+        Plan several topics at once; returns {topic: tasks}.
+        With use_batch_api the planner prompts go through the OpenAI Batch API
+        in two rounds: the combined preflight prompt for every topic, then
+        the same subtopic request analyze_and_break_down_topic would make for
+        each complex one. Otherwise each topic runs through plan_research
+        concurrently.
         """
-        prompt = f"""
-        Based on this research topic: "{research_topic}"
+        research_topics = list(dict.fromkeys(research_topics))
+        if not self.use_batch_api:
+            plans = await asyncio.gather(*(self.plan_research(topic) for topic in research_topics))
+            return dict(zip(research_topics, plans))
+        
+        topic_ids = {topic: hashlib.sha256(topic.encode("utf-8")).hexdigest()[:16]
+                     for topic in research_topics}
+        
+        requests = {}
+        for topic, topic_id in topic_ids.items():
+            requests[f"{topic_id}:preflight"] = self._preflight_messages(topic)
+        replies = await self._run_chat_batch(requests)
         
-        Generate exactly 3 follow-up questions that would help gather more context and clarify:
+        contexts = {}
+        analyses = {}
+        subtopic_requests = {}
+        for topic, topic_id in topic_ids.items():
+            preflight = replies.get(f"{topic_id}:preflight") or {}
+            if preflight.get("questions"):
+                _, question_message = self._format_follow_up_questions(preflight)
+            else:
+                _, question_message = self._get_fallback_follow_up_questions(topic)
+            contexts[topic] = f"{topic}\n\nAdditional context/questions to consider:\n{question_message}"
+            
+            analysis = preflight.get("complexity")
+            if not _is_complexity_analysis(analysis):
+                analysis = self._get_fallback_complexity_analysis(topic)
+            analyses[topic] = analysis
+            if analysis["is_complex"]:
+                subtopic_requests[f"{topic_id}:subtopics"] = self._breakdown_messages(
+                    topic, contexts[topic], analysis)
+        replies = await self._run_chat_batch(subtopic_requests) if subtopic_requests else {}
+        
+        plans = {}
+        for topic, topic_id in topic_ids.items():
+            sub_topics = self._breakdown_sub_topics(topic, contexts[topic], analyses[topic],
+                                                    replies.get(f"{topic_id}:subtopics"))
+            plans[topic] = self._build_tasks(sub_topics)
         
-        IMPORTANT: Respond ONLY with valid JSON in this exact format:
-        {{
-            "questions": [
-                "First follow-up question?",
-                "Second follow-up question?",
-                "Third follow-up question?"
-            ],
-            "explanation": "Brief explanation of why these questions are important for this research"
-        }}
+        self.task_queue = [task for tasks in plans.values() for task in tasks]
+        return plans
+    
+    async def _run_chat_batch(self, requests: Dict[str, List[Dict[str, str]]],
+                              temperature: float = 0.1) -> Dict[str, Dict[str, Any]]:
+        """
+        Run JSON-mode chat prompts, keyed by custom_id, through the Batch API.
+        Returns {custom_id: parsed reply}; prompts that fail or never finish
+        are left out so callers can fall back per item. Replies share the
+        _chat_json disk cache, and cached prompts are not resubmitted.
         """
+        results = {}
+        keys = {}
+        lines = []
+        cache_keys = [self.cache.make_key(self.model_name, temperature, messages)
+                      for messages in requests.values()]
+        cached_replies = await asyncio.gather(*(self.cache.aget(key) for key in cache_keys))
+        for (custom_id, messages), key, cached in zip(requests.items(), cache_keys, cached_replies):
+            if cached is not None:
+                results[custom_id] = orjson.loads(cached)
+                continue
+            keys[custom_id] = key
+            lines.append(orjson.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model_name,
+                    "messages": messages,
+                    "temperature": temperature,
+                    "response_format": {"type": "json_object"}
+                }
+            }))
+        if not lines:
+            return results
         
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a research planning expert. Respond ONLY with valid JSON. No additional text."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1
-            )
-            
-            response_text = response.choices[0].message.content.strip()
-            
-            # Clean the response - remove any markdown formatting
-            if response_text.startswith("```json"):
-                response_text = response_text.replace("```json", "").replace("```", "").strip()
-            
-            # Parse JSON response
-            import json
-            question_data = json.loads(response_text)
-            questions = question_data.get("questions", [])
-            explanation = question_data.get("explanation", "")
-            
-            # Format questions into a message
-            question_message = "To better focus the research, please consider these follow-up questions:\n\n"
-            for i, question in enumerate(questions, 1):
-                question_message += f"{i}. {question}\n"
-            question_message += f"\n{explanation}"
-            
-            return questions, question_message
-            
+            batch_file = await self.client.files.create(
+                file=("planner_batch.jsonl", b"\n".join(lines)), purpose="batch")
+            batch = await self.client.batches.create(input_file_id=batch_file.id,
+                                                     endpoint="/v1/chat/completions",
+                                                     completion_window="24h")
+            logger.info("Submitted planner batch %s (%d requests)", batch.id, len(lines))
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                await asyncio.sleep(self.batch_poll_interval)
+                batch = await self.client.batches.retrieve(batch.id)
+            if batch.status != "completed" or not batch.output_file_id:
+                logger.warning("Planner batch %s ended with status '%s'", batch.id, batch.status)
+                return results
+            output = await self.client.files.content(batch.output_file_id)
         except Exception as e:
-            print(f"Error generating follow-up questions: {e}")
-            fallback_questions = [
-                f"What specific aspects of {research_topic} are you most interested in?",
-                f"Are there any time constraints or geographic focus for this research on {research_topic}?",
-                f"What is the primary goal or outcome you hope to achieve with this research?"
-            ]
-            fallback_message = "To better focus the research, please consider these follow-up questions:\n\n"
-            for i, question in enumerate(fallback_questions, 1):
-                fallback_message += f"{i}. {question}\n"
+            logger.warning("Error running planner batch: %s", e)
+            return results
+        
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            # A bad line only fails its own request; the caller falls back for it
+            try:
+                row = orjson.loads(line)
+                response = row.get("response") or {}
+                custom_id = row.get("custom_id")
+                if custom_id not in keys or response.get("status_code") != 200:
+                    continue
+                reply = response["body"]["choices"][0]["message"]["content"]
+                data = orjson.loads(reply)
+            except (orjson.JSONDecodeError, AttributeError, KeyError, IndexError, TypeError) as e:
+                logger.warning("Skipping unusable planner batch line: %s", e)
+                logger.debug("Raw line: %s", line)
+                continue
+            if not isinstance(data, dict):
+                continue
+            results[custom_id] = data
+            await self.cache.aset(keys[custom_id], reply)
+        return results
+    
+    async def generate_follow_up_questions(self, research_topic: str) -> Tuple[List[str], str]:
+        """
+        Generate 3 follow-up questions to gather more context about the research topic.
+        Returns both the list of questions and a formatted message containing the questions.
+        """
+        try:
+            question_data = await self._preflight(research_topic)
+            return self._format_follow_up_questions(question_data)
             
-            return fallback_questions, fallback_message
+        except Exception as e:
+            logger.warning("Error generating follow-up questions: %s", e)
+            return self._get_fallback_follow_up_questions(research_topic)
+    
+    async def _preflight(self, research_topic: str) -> Dict[str, Any]:
+        """
+        Follow-up questions and complexity analysis for research_topic from one
+        LLM call. The reply is memoized per topic, and concurrent callers share
+        the in-flight request; a failed call is forgotten so it can be retried.
+        """
+        future = self._preflight_memo.get(research_topic)
+        if future is None:
+            future = asyncio.ensure_future(self._chat_json(self._preflight_messages(research_topic)))
+            self._preflight_memo[research_topic] = future
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            if self._preflight_memo.get(research_topic) is future:
+                del self._preflight_memo[research_topic]
+            raise
+    
+    def _memoized_complexity(self, research_topic: str) -> Optional[Dict[str, Any]]:
+        """The complexity half of a finished _preflight reply for research_topic, if any."""
+        future = self._preflight_memo.get(research_topic)
+        if future is None or not future.done() or future.cancelled() or future.exception():
+            return None
+        complexity = future.result().get("complexity")
+        return complexity if _is_complexity_analysis(complexity) else None
+    
+    def _preflight_messages(self, research_topic: str) -> List[Dict[str, str]]:
+        """Chat messages for the combined follow-up/complexity prompt."""
+        return [
+            _PLANNER_SYSTEM_MESSAGE,
+            {"role": "user", "content": _PREFLIGHT_TEMPLATE.substitute(topic=research_topic)}
+        ]
+    
+    def _format_follow_up_questions(self, question_data: Dict[str, Any]) -> Tuple[List[str], str]:
+        """Return the questions from a follow-up reply and a formatted message."""
+        questions = question_data.get("questions", [])
+        explanation = question_data.get("explanation", "")
+        
+        # Format questions into a message
+        question_message = _FOLLOW_UP_INTRO + _numbered_lines(questions) + f"\n{explanation}"
+        
+        return questions, question_message
+    
+    def _get_fallback_follow_up_questions(self, research_topic: str) -> Tuple[List[str], str]:
+        """Fallback follow-up questions when LLM fails."""
+        fallback_questions = [
+            f"What specific aspects of {research_topic} are you most interested in?",
+            f"Are there any time constraints or geographic focus for this research on {research_topic}?",
+            f"What is the primary goal or outcome you hope to achieve with this research?"
+        ]
+        fallback_message = _FOLLOW_UP_INTRO + _numbered_lines(fallback_questions)
+        
+        return fallback_questions, fallback_message
 
-    @pytest.mark.asyncio
     async def delegate_tasks(self, tasks: List[Dict[str, Any]]) -> List[TaskResult]:
         """
         Efficiently delegate tasks to sub-agents with parallelization.
         Groups tasks by type and executes them concurrently.
         """
+        return [result async for result in self.delegate_tasks_as_completed(tasks)]
+    
+    async def delegate_tasks_as_completed(self, tasks: List[Dict[str, Any]]) -> AsyncIterator[TaskResult]:
+        """
+        Like delegate_tasks, but yield each TaskResult as soon as it finishes.
+        All task groups run concurrently; results arrive in completion order.
+        """
         if not tasks:
-            return []
+            return
         
-        task_groups = self.group_tasks_by_type(tasks)
-
-        all_results = []
-        for task_type, task_list in task_groups.items():
-            capable_agents = []
-            for agent in self.sub_agents:
-                if agent.can_handle_task(task_type):
-                    capable_agents.append(agent)
-
-            if capable_agents:
-                results = await self.execute_tasks_parallel(task_list, capable_agents)
-                all_results.extend(results)
-            else:
-                print(f"Warning: No agents available for task type '{task_type}'")
-
-        print(self.get_research_summary())
-        return all_results
+        groups = []
+        for task_type, task_list in self.group_tasks_by_type(tasks).items():
+            capable_agents = self._capable_agents(task_type)
+            if not capable_agents:
+                logger.warning("No agents available for task type '%s'", task_type)
+                continue
+            groups.append((task_list, capable_agents))
+        
+        async for result in self._run_worker_pool(groups):
+            yield result
+        
+        logger.debug("Research summary: %s", self.get_research_summary())
+    
+    def _capable_agents(self, task_type: str) -> List[BaseAgent]:
+        """
+        Sub-agents that can handle the given task type.
+        Each type is resolved with can_handle_task once and kept in
+        _capability_index; add_sub_agent keeps the index current.
+        """
+        agents = self._capability_index.get(task_type)
+        if agents is None:
+            agents = [agent for agent in self.sub_agents if agent.can_handle_task(task_type)]
+            self._capability_index[task_type] = agents
+        return agents
         
-    async def analyze_and_break_down_topic(self, research_topic: str, enhanced_context: str = "") -> List[Dict[str, Any]]:
+    async def analyze_and_break_down_topic(self, research_topic: str, enhanced_context: str = "",
+                                           complexity_analysis: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """
         Use LLM to analyze the research topic and intelligently break it down.
         Now includes additional context from follow-up questions.
+        Pass a precomputed complexity_analysis to skip that LLM call.
         """
-        complexity_analysis = await self.analyze_topic_complexity(research_topic, enhanced_context)
-
-        if complexity_analysis["is_complex"]:
-            # If complex, break down into sub-topics
-            sub_topics = await self.generate_subtopics(research_topic, complexity_analysis, enhanced_context)
-        else:
-            # It simple, single research task
-            sub_topics = [{
-                "query": research_topic,
-                "description": f"Comprehensive research on {research_topic}",
-                "context": enhanced_context if enhanced_context else "provide a thorough overview of the topic",
-                "priority": "high"
-            }]
+        if complexity_analysis is None:
+            complexity_analysis = await self.analyze_topic_complexity(research_topic, enhanced_context)
         
+        reply = None
+        messages = self._breakdown_messages(research_topic, enhanced_context, complexity_analysis)
+        if messages is not None:
+            try:
+                reply = await self._chat_json(messages)
+            except orjson.JSONDecodeError as e:
+                logger.warning("JSON parsing error in subtopic generation: %s", e)
+            except Exception as e:
+                logger.warning("Error generating subtopics: %s", e)
+        
+        return self._breakdown_sub_topics(research_topic, enhanced_context, complexity_analysis, reply)
+    
+    def _breakdown_messages(self, research_topic: str, enhanced_context: str,
+                            complexity_analysis: Dict[str, Any]) -> Optional[List[Dict[str, str]]]:
+        """
+        The subtopic request for a topic breakdown, or None for a simple topic.
+        More than 3 aspects get one batched request with a subtopic per aspect
+        (see analyze_and_break_down_topic_batched); otherwise generate_subtopics'
+        prompt is used. plan_research_batch sends the same requests.
+        """
+        if not complexity_analysis["is_complex"]:
+            return None
+        if len(complexity_analysis.get("main_aspects", [])) > 3:
+            return self._batch_messages(self._aspect_items(research_topic, complexity_analysis),
+                                        _BATCHED_SUBTOPIC_SYSTEM_PROMPT, enhanced_context)
+        return self._subtopic_messages(research_topic, complexity_analysis, enhanced_context)
+    
+    def _breakdown_sub_topics(self, research_topic: str, enhanced_context: str,
+                              complexity_analysis: Dict[str, Any],
+                              reply: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Subtopics from the reply to _breakdown_messages (None if that request failed)."""
+        if not complexity_analysis["is_complex"]:
+            # It simple, single research task
+            return self._single_subtopic(research_topic, enhanced_context)
+        if not isinstance(reply, dict):
+            return self._get_fallback_subtopics(research_topic)
+        if len(complexity_analysis.get("main_aspects", [])) > 3:
+            items = self._aspect_items(research_topic, complexity_analysis)
+            return self._aspect_subtopics(research_topic, items, self._batch_results(reply, len(items)))
+        return reply.get("subtopics") or self._get_fallback_subtopics(research_topic)
+    
+    async def analyze_and_break_down_topic_batched(self, research_topic: str, enhanced_context: str,
+                                                   complexity_analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Generate one subtopic per main aspect with a single batched request,
+        for at most recommended_subtopics (and max_parallel_tasks) aspects.
+        Aspects the model skips get a plain aspect-based subtopic instead, and
+        fields missing from a partial result are filled in from the aspect.
+        """
+        items = self._aspect_items(research_topic, complexity_analysis)
+        try:
+            results = await self._batch_chat_json(items, _BATCHED_SUBTOPIC_SYSTEM_PROMPT,
+                                                   context=enhanced_context)
+        except Exception as e:
+            logger.warning("Error generating batched subtopics: %s", e)
+            return self._get_fallback_subtopics(research_topic)
+        return self._aspect_subtopics(research_topic, items, results)
+    
+    def _aspect_items(self, research_topic: str, complexity_analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Batch items for the first min(recommended_subtopics, max_parallel_tasks) main aspects."""
+        main_aspects = complexity_analysis.get("main_aspects", [])
+        # Same task count as generate_subtopics: no more than recommended
+        try:
+            recommended = int(complexity_analysis.get("recommended_subtopics", len(main_aspects)))
+        except (TypeError, ValueError):
+            recommended = len(main_aspects)
+        main_aspects = main_aspects[:max(1, min(recommended, self.max_parallel_tasks))]
+        research_approach = complexity_analysis.get("research_approach", "comprehensive")
+        return [{"topic": research_topic, "aspect": aspect, "research_approach": research_approach}
+                for aspect in main_aspects]
+    
+    def _aspect_subtopics(self, research_topic: str, items: List[Dict[str, Any]],
+                          results: List[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """One subtopic per aspect item, filling gaps in the model's results from the aspect."""
+        sub_topics = []
+        for item, result in zip(items, results):
+            aspect = item["aspect"]
+            fallback = {
+                "query": f"{research_topic} {aspect}",
+                "description": f"Research on {aspect}",
+                "context": aspect,
+                "priority": "medium"
+            }
+            if result and result.get("query"):
+                fallback.update((key, value) for key, value in result.items() if value)
+            sub_topics.append(fallback)
         return sub_topics
+    
+    async def _batch_chat_json(self, items: List[Dict[str, Any]], system: str,
+                               context: str = "") -> List[Optional[Dict[str, Any]]]:
+        """
+        Answer several independent prompt items with one JSON-mode request.
+        Returns one result per item, in item order; None where the model
+        returned nothing usable.
+        """
+        data = await self._chat_json(self._batch_messages(items, system, context))
+        return self._batch_results(data, len(items))
+    
+    def _batch_messages(self, items: List[Dict[str, Any]], system: str,
+                        context: str = "") -> List[Dict[str, str]]:
+        """Chat messages asking for one JSON result per item."""
+        prompt = (f'Return a JSON object {{"results": [...]}} with exactly {len(items)} results, '
+                  f"one per item, in the same order as the items.\n\n"
+                  f"Items:\n{orjson.dumps(items, option=orjson.OPT_INDENT_2).decode()}")
+        if context:
+            prompt += f"\n\nAdditional Context: {context}"
+        return [{"role": "system", "content": system}, {"role": "user", "content": prompt}]
+    
+    @staticmethod
+    def _batch_results(data: Dict[str, Any], count: int) -> List[Optional[Dict[str, Any]]]:
+        """Exactly count results from a batched reply; None where a result is missing or malformed."""
+        results = data.get("results")
+        if not isinstance(results, list):
+            results = []
+        results = [result if isinstance(result, dict) else None for result in results[:count]]
+        return results + [None] * (count - len(results))
+    
+    def _single_subtopic(self, research_topic: str, enhanced_context: str = "") -> List[Dict[str, Any]]:
+        """The whole topic as one research task, for topics that are not complex."""
+        return [{
+            "query": research_topic,
+            "description": f"Comprehensive research on {research_topic}",
+            "context": enhanced_context if enhanced_context else "provide a thorough overview of the topic",
+            "priority": "high"
+        }]
 
     async def analyze_topic_complexity(self, research_topic: str, enhanced_context: str = "") -> Dict[str, Any]:
-        """Ask LLM to determine if a topic is complex and how to approach it."""
-        context_text = f"\nAdditional Context: {enhanced_context}" if enhanced_context else ""
-        
-        prompt = f"""
-        Analyze this research topic for complexity and research strategy:
-        
-        Topic: "{research_topic}"{context_text}
-        
-        Please evaluate:
-        1. What are the main aspects/dimensions of this topic?
-        2. How many sub-research areas would be optimal (between 1-10)?
-        3. What type of research approach would work best?
-        
-        IMPORTANT: Respond ONLY with valid JSON in this exact format:
-        {{
-            "is_complex": true,
-            "main_aspects": ["aspect1", "aspect2"],
-            "recommended_subtopics": <integer between 1 and 10>,
-            "research_approach": "analytical",
-            "reasoning": "explanation here"
-        }}
         """
-        
+        Ask LLM to determine if a topic is complex and how to approach it.
+        Without enhanced_context this reads the shared _preflight reply.
+        """
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a research planning expert. Respond ONLY with valid JSON. No additional text."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1  # Very low temperature for consistent JSON
-            )
-            
-            response_text = response.choices[0].message.content.strip()
-            
-            # Clean the response - remove any markdown formatting
-            if response_text.startswith("```json"):
-                response_text = response_text.replace("```json", "").replace("```", "").strip()
-            
-            # Parse JSON response
-            import json
-            analysis = json.loads(response_text)
+            if enhanced_context:
+                analysis = await self._chat_json(self._complexity_messages(research_topic, enhanced_context))
+            else:
+                analysis = (await self._preflight(research_topic))["complexity"]
+            if not _is_complexity_analysis(analysis):
+                raise ValueError(f"unexpected complexity analysis: {analysis!r}")
 
-            # Print out the specific results you requested
-            print("\n----- Topic Analysis Results -----")
-            print(f"Main Aspects: {analysis.get('main_aspects', [])}")
-            print(f"Recommended Subtopics: {analysis.get('recommended_subtopics', 0)}")
-            print(f"Research Approach: {analysis.get('research_approach', 'N/A')}")
-            print(f"Reasoning: {analysis.get('reasoning', 'N/A')}")
-            print("--------------------------------\n")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Topic analysis: main aspects=%s, recommended subtopics=%s, "
+                    "research approach=%s, reasoning=%s",
+                    analysis.get('main_aspects', []),
+                    analysis.get('recommended_subtopics', 0),
+                    analysis.get('research_approach', 'N/A'),
+                    analysis.get('reasoning', 'N/A')
+                )
 
             return analysis
             
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error in complexity analysis: {e}")
-            print(f"Raw response: {response_text}")
+        except orjson.JSONDecodeError as e:
+            logger.warning("JSON parsing error in complexity analysis: %s", e)
             # Return fallback
             return self._get_fallback_complexity_analysis(research_topic)
         except Exception as e:
-            print(f"Error analyzing topic complexity: {e}")
+            logger.warning("Error analyzing topic complexity: %s", e)
             return self._get_fallback_complexity_analysis(research_topic)
 
+    def _complexity_messages(self, research_topic: str, enhanced_context: str = "") -> List[Dict[str, str]]:
+        """Chat messages asking for a complexity analysis of research_topic."""
+        context_text = f"\nAdditional Context: {enhanced_context}" if enhanced_context else ""
+        
+        prompt = _COMPLEXITY_TEMPLATE.substitute(topic=research_topic, context_text=context_text)
+        return [_PLANNER_SYSTEM_MESSAGE, {"role": "user", "content": prompt}]
+
     def _get_fallback_complexity_analysis(self, research_topic: str) -> Dict[str, Any]:
         """Fallback complexity analysis when LLM fails."""
         return {
@@ -240,59 +645,35 @@ class Supervisor(BaseAgent):
     async def generate_subtopics(self, research_topic: str, complexity_analysis: Dict[str, Any], 
                                enhanced_context: str = "") -> List[Dict[str, Any]]:
         """Use LLM to generate specific sub-research topics with context."""
-        num_subtopics = complexity_analysis.get("recommended_subtopics", self.max_parallel_tasks)
-        main_aspects = complexity_analysis.get("main_aspects", [])
-        
-        context_text = f"\nAdditional Context: {enhanced_context}" if enhanced_context else ""
-
-        prompt = f"""
-        Create {num_subtopics} focused research sub-topics for: "{research_topic}"{context_text}
-        
-        Main aspects to cover: {main_aspects}
-        Research approach: {complexity_analysis.get('research_approach', 'comprehensive')}
-        
-        IMPORTANT: Respond ONLY with valid JSON in this exact format:
-        {{
-            "subtopics": [
-                {{
-                    "query": "specific search terms",
-                    "description": "what this sub-research focuses on",
-                    "context": "specific angle or focus area",
-                    "priority": "high",
-                    "rationale": "why this subtopic is important"
-                }}
-            ]
-        }}
-        """
-
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a research strategy expert. Respond ONLY with valid JSON. No additional text."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1
-            )
-            
-            response_text = response.choices[0].message.content.strip()
-            
-            # Clean the response
-            if response_text.startswith("```json"):
-                response_text = response_text.replace("```json", "").replace("```", "").strip()
-            
-            import json
-            subtopic_data = json.loads(response_text)
+            subtopic_data = await self._chat_json(
+                self._subtopic_messages(research_topic, complexity_analysis, enhanced_context))
             return subtopic_data["subtopics"]
             
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error in subtopic generation: {e}")
-            print(f"Raw response: {response_text}")
+        except orjson.JSONDecodeError as e:
+            logger.warning("JSON parsing error in subtopic generation: %s", e)
             return self._get_fallback_subtopics(research_topic)
         except Exception as e:
-            print(f"Error generating subtopics: {e}")
+            logger.warning("Error generating subtopics: %s", e)
             return self._get_fallback_subtopics(research_topic)
 
+    def _subtopic_messages(self, research_topic: str, complexity_analysis: Dict[str, Any],
+                           enhanced_context: str = "") -> List[Dict[str, str]]:
+        """Chat messages asking for subtopics that cover complexity_analysis."""
+        num_subtopics = complexity_analysis.get("recommended_subtopics", self.max_parallel_tasks)
+        main_aspects = complexity_analysis.get("main_aspects", [])
+        
+        context_text = f"\nAdditional Context: {enhanced_context}" if enhanced_context else ""
+
+        prompt = _SUBTOPIC_TEMPLATE.substitute(
+            num_subtopics=num_subtopics,
+            topic=research_topic,
+            context_text=context_text,
+            main_aspects=main_aspects,
+            research_approach=complexity_analysis.get('research_approach', 'comprehensive')
+        )
+        return [_STRATEGIST_SYSTEM_MESSAGE, {"role": "user", "content": prompt}]
+
     def _get_fallback_subtopics(self, research_topic: str) -> List[Dict[str, Any]]:
         """Fallback subtopic generation when LLM fails."""
         return [{
@@ -305,57 +686,99 @@ class Supervisor(BaseAgent):
 
     def group_tasks_by_type(self, tasks: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
         """Group tasks by their type for efficient agent assignment."""
-        task_groups = {}
+        task_groups = defaultdict(list)
         for task in tasks:
-            task_type = task.get("type", "unknown")
-            if task_type not in task_groups:
-                task_groups[task_type] = []
-            task_groups[task_type].append(task)
+            task_groups[task.get("type", "unknown")].append(task)
         
-        return task_groups
+        return dict(task_groups)
 
-    async def execute_tasks_parallel(self, tasks: List[Dict[str, Any]], agents: List[BaseAgent]) -> List[TaskResult]:
+    async def execute_tasks_parallel(self, tasks: List[Dict[str, Any]], agents: List[BaseAgent]) -> AsyncIterator[TaskResult]:
         """
         Execute tasks in parallel using available agents.
-        Implements load balancing across agents.
+        Implements load balancing across agents and yields each TaskResult
+        as soon as it finishes; use [r async for r in ...] for a list.
         """
         if not tasks or not agents:
-            return []
+            return
         
-        # Limit concurrent tasks to prevent overwhelming
-        semaphore = asyncio.Semaphore(self.max_parallel_tasks)
+        async for result in self._run_worker_pool([(tasks, agents)]):
+            yield result
+    
+    async def _run_worker_pool(self, groups: List[Tuple[List[Dict[str, Any]], List[BaseAgent]]]) -> AsyncIterator[TaskResult]:
+        """
+        Run each (tasks, agents) group with work-stealing agent workers.
+        Every agent gets max_parallel_tasks // len(agents) workers (at least
+        one) that pull from the group's shared queue, so faster agents drain
+        more tasks instead of waiting behind a slow one. All groups share one
+        semaphore, so at most max_parallel_tasks tasks run at once overall.
+        Yields results in completion order. If an agent raises past _run_task
+        (e.g. a cancellation from inside execute_task), that error is
+        re-raised here instead of leaving the pool waiting for a result that
+        never comes.
+        """
+        done = asyncio.Queue()
+        running = asyncio.Semaphore(self.max_parallel_tasks)
         
-        async def execute_single_task(task: Dict[str, Any], agent: BaseAgent) -> TaskResult:
-            async with semaphore:
+        async def agent_worker(agent: BaseAgent, todo: asyncio.Queue):
+            while True:
                 try:
-                    print(f"Agent {agent.agent_id} executing: {task.get('description', 'Unknown task')}")
-                    result = await agent.execute_task(task)
-                    return result
-                except Exception as e:
-                    # Handle agent failures gracefully
-                    return TaskResult(
-                        task_id=task.get("task_id", "failed_task"),
-                        task_description=task.get("description", "Failed task"),
-                        findings=f"Task failed with error: {str(e)}",
-                        sources=[],
-                        confidence_score=0.0,
-                        status="failed"
-                    )
-        
-        # Distribute tasks across agents (round-robin, sequential manner)
-        task_assignments = []
-        for i, task in enumerate(tasks):
-            agent = agents[i % len(agents)]  # Round-robin assignment
-            task_assignments.append(execute_single_task(task, agent))
-        
-        # Execute all tasks concurrently
-        results = await asyncio.gather(*task_assignments, return_exceptions=True)
+                    task = todo.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    async with running:
+                        result = await self._run_task(task, agent)
+                except BaseException as e:
+                    # Wake the consumer; this worker is about to die
+                    done.put_nowait(e)
+                    raise
+                done.put_nowait(result)
         
-        # Filter out exceptions and return valid results
-        valid_results = [result for result in results 
-                        if isinstance(result, TaskResult)]
+        workers = []
+        total = 0
+        for tasks, agents in groups:
+            if not tasks or not agents:
+                continue
+            todo = asyncio.Queue()
+            for task in tasks:
+                todo.put_nowait(task)
+            total += len(tasks)
+            
+            per_agent = max(1, self.max_parallel_tasks // len(agents))
+            slots = min(per_agent * len(agents), len(tasks))
+            # Interleave agents so a short queue still spreads across all of them
+            for slot in range(slots):
+                agent = agents[slot % len(agents)]
+                workers.append(asyncio.create_task(agent_worker(agent, todo)))
         
-        return valid_results
+        try:
+            for _ in range(total):
+                result = await done.get()
+                if isinstance(result, BaseException):
+                    raise result
+                yield result
+        finally:
+            for w in workers:
+                w.cancel()
+    
+    async def _run_task(self, task: Dict[str, Any], agent: BaseAgent) -> TaskResult:
+        """Run one task on an agent; failures become a failed TaskResult."""
+        try:
+            logger.debug("Agent %s executing: %s", agent.agent_id, task.get('description', 'Unknown task'))
+            result = await agent.execute_task(task)
+            return result
+        except Exception as e:
+            # Handle agent failures gracefully. Cancellation is a BaseException
+            # and propagates, so an interrupted run is not reported as failed tasks.
+            logger.warning("Agent %s failed: %s: %s", agent.agent_id, task.get('description', 'Unknown task'), e)
+            return TaskResult(
+                task_id=task.get("task_id", "failed_task"),
+                task_description=task.get("description", "Failed task"),
+                findings=f"Task failed with error: {str(e)}",
+                sources=[],
+                confidence_score=0.0,
+                status="failed"
+            )
     
     # Required abstract methods from BaseAgent
     async def execute_task(self, task: Dict[str, Any]) -> TaskResult:
@@ -405,6 +828,6 @@ class Supervisor(BaseAgent):
         return {
             "total_agents": len(self.sub_agents),
             "queued_tasks": len(self.task_queue),
-            "agent_capabilities": [agent.capabilities for agent in self.sub_agents],
+            "agent_capabilities": self._agent_capabilities,
             "max_parallel_tasks": self.max_parallel_tasks
         }
\ No newline at end of file
@@ -1,5 +1,6 @@
 import pytest
 import asyncio
+import orjson
 from typing import List, Dict, Any
 from unittest.mock import Mock, patch, AsyncMock
 
@@ -7,8 +8,11 @@ from unittest.mock import Mock, patch, AsyncMock
 from agent import TaskResult, BaseAgent
 from web_researcher import WebResearcher
 from supervisor import Supervisor
-from reporter import Reporter
+from reporter import REPORT_RESET, Reporter
 from main_system import DeepResearchSystem
+from llm_cache import LLMResponseCache, ResponseCache, cached_chat_completion
+from clients import RateLimiter
+from speaker import Speaker
 
 # ============================================================================
 # MOCK CLASSES AND FIXTURES
@@ -36,6 +40,31 @@ def sample_task_result():
         status="completed"
     )
 
+class StubAgent(BaseAgent):
+    """Agent for the given task types whose execute_task awaits run(task)."""
+    
+    def __init__(self, agent_id: str, task_types: List[str], run):
+        super().__init__(agent_id=agent_id)
+        self.capabilities = list(task_types)
+        self.run = run
+    
+    async def execute_task(self, task: Dict[str, Any]) -> TaskResult:
+        return await self.run(task)
+    
+    def can_handle_task(self, task_type: str) -> bool:
+        return task_type in self.capabilities
+
+def completed_result(task: Dict[str, Any]) -> TaskResult:
+    """A completed TaskResult for task."""
+    return TaskResult(
+        task_id=task["task_id"],
+        task_description=task.get("description", ""),
+        findings="done",
+        sources=[],
+        confidence_score=0.5,
+        status="completed"
+    )
+
 # ============================================================================
 # AGENT.PY TESTS
 # ============================================================================
@@ -106,7 +135,85 @@ class TestWebResearcher:
         assert researcher.can_handle_task("academic_research") == False
         assert researcher.can_handle_task("data_analysis") == False
         assert researcher.can_handle_task("unknown_task") == False
-    
+
+    def test_clean_extracted_content(self):
+        """Test whitespace collapsing and noise removal."""
+        researcher = WebResearcher()
+
+        cleaned = researcher.clean_extracted_content("Read our cookie policy  and then\n\nFollow us on X ")
+        assert cleaned == "Read our and then on X"
+
+    def test_deduplicate_sources(self):
+        """Test syndicated copies are dropped and distinct pages kept."""
+        researcher = WebResearcher()
+        article = " ".join(f"word{i}" for i in range(200))
+        sources = [
+            {"url": "https://a.com", "content": article},
+            {"url": "https://b.com", "content": article.replace("word50", "changed")},
+            {"url": "https://c.com", "content": "  " + article + "  "},
+            {"url": "https://d.com", "content": " ".join(f"other{i}" for i in range(200))},
+        ]
+
+        unique = researcher.deduplicate_sources(sources)
+        assert [item["url"] for item in unique] == ["https://a.com", "https://d.com"]
+
+    def test_relevance_rewards_query_keywords(self):
+        """Test pages mentioning the query score higher than unrelated pages."""
+        researcher = WebResearcher()
+        source = {"domain": "example.com", "title": "Short"}
+        query_tokens = frozenset({"ai", "healthcare"})
+
+        matching = researcher.calculate_relevance_score("AI is changing healthcare", source, query_tokens)
+        unrelated = researcher.calculate_relevance_score("Recipes for dinner", source, query_tokens)
+        assert matching == pytest.approx(0.3)
+        assert unrelated == 0.0
+
+    @pytest.mark.asyncio
+    async def test_search_has_its_own_connection_pool(self):
+        """Test Google searches are not held to the scrape pool's per-host limit."""
+        researcher = WebResearcher()
+        try:
+            scrape_session = await researcher._get_session()
+            search_session = await researcher._get_search_session()
+            
+            assert search_session is not scrape_session
+            assert scrape_session.connector.limit_per_host == 3
+            assert search_session.connector.limit_per_host == 10
+        finally:
+            await researcher.aclose()
+        assert search_session.closed and scrape_session.closed
+
+    @pytest.mark.asyncio
+    async def test_extract_skips_document_urls(self):
+        """Test PDFs and images are skipped without being fetched."""
+        researcher = WebResearcher()
+        search_results = [
+            {"url": "https://a.com/report.PDF?dl=1", "title": "Report", "domain": "a.com"},
+            {"url": "https://b.com/chart.png", "title": "Chart", "domain": "b.com"},
+            {"url": "https://c.com/article", "title": "Article", "domain": "c.com"},
+        ]
+
+        with patch.object(researcher, "scrape_web_content", new=AsyncMock(return_value="x" * 200)) as scrape:
+            extracted = await researcher.extract_content_from_sources(search_results)
+
+        scrape.assert_awaited_once_with("https://c.com/article")
+        assert [item["url"] for item in extracted] == ["https://c.com/article"]
+
+    @pytest.mark.asyncio
+    async def test_extract_survives_malformed_sources(self):
+        """Test one malformed search result does not abort extraction of the others."""
+        researcher = WebResearcher()
+        search_results = [
+            "not a source",
+            {"title": "No URL", "domain": "b.com"},
+            {"url": "https://c.com/article", "title": "Article", "domain": "c.com"},
+        ]
+
+        with patch.object(researcher, "scrape_web_content", new=AsyncMock(return_value="x" * 200)):
+            extracted = await researcher.extract_content_from_sources(search_results)
+
+        assert [item["url"] for item in extracted] == ["https://c.com/article"]
+
     @pytest.mark.asyncio
     async def test_execute_task_success(self, sample_task):
         """Test successful task execution."""
@@ -148,6 +255,271 @@ class TestSupervisor:
     @pytest.mark.skip(reason="Supervisor is abstract - test with concrete implementation")
     def test_init(self):
         pass
+    
+    @pytest.fixture
+    def supervisor(self, tmp_path):
+        """Supervisor with its planner cache in a temporary directory."""
+        supervisor = Supervisor()
+        supervisor.cache = LLMResponseCache(cache_dir=str(tmp_path))
+        return supervisor
+    
+    @pytest.mark.asyncio
+    async def test_chat_json_answers_repeats_from_cache(self, supervisor):
+        """Test a repeated planner prompt is parsed from the disk cache without an API call."""
+        messages = [{"role": "user", "content": "plan"}]
+        completion = AsyncMock(return_value='{"ok": true}')
+        
+        with patch("supervisor.cached_chat_completion", new=completion):
+            first = await supervisor._chat_json(messages)
+            second = await supervisor._chat_json(messages)
+        
+        assert first == second == {"ok": True}
+        completion.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_worker_pool_surfaces_agent_cancellation(self, supervisor):
+        """Test a task cancelled inside an agent ends the run instead of hanging it."""
+        async def run(task):
+            if task["task_id"] == "t1":
+                raise asyncio.CancelledError()
+            return completed_result(task)
+        
+        supervisor.add_sub_agent(StubAgent("agent", ["web_search"], run))
+        tasks = [{"task_id": f"t{i}", "type": "web_search"} for i in range(3)]
+        
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(supervisor.delegate_tasks(tasks), timeout=2)
+    
+    @pytest.mark.asyncio
+    async def test_worker_pool_caps_concurrency_across_task_types(self, supervisor):
+        """Test max_parallel_tasks bounds running tasks over all task groups together."""
+        running = 0
+        peak = 0
+        
+        async def run(task):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return completed_result(task)
+        
+        supervisor.max_parallel_tasks = 4
+        supervisor.add_sub_agent(StubAgent("agent", ["web_search", "fact_checking"], run))
+        tasks = [{"task_id": f"t{i}", "type": "web_search" if i % 2 else "fact_checking"}
+                 for i in range(12)]
+        
+        results = await supervisor.delegate_tasks(tasks)
+        
+        assert sorted(result.task_id for result in results) == sorted(task["task_id"] for task in tasks)
+        assert peak == 4
+    
+    @pytest.mark.asyncio
+    async def test_worker_pool_yields_in_completion_order(self, supervisor):
+        """Test a fast agent's results arrive first and it takes more of the shared queue."""
+        async def slow(task):
+            await asyncio.sleep(0.2)
+            return completed_result(task)
+        
+        async def fast(task):
+            await asyncio.sleep(0.01)
+            return completed_result(task)
+        
+        supervisor.max_parallel_tasks = 2
+        supervisor.add_sub_agent(StubAgent("slow", ["web_search"], slow))
+        supervisor.add_sub_agent(StubAgent("fast", ["web_search"], fast))
+        tasks = [{"task_id": f"t{i}", "type": "web_search"} for i in range(6)]
+        
+        results = [result async for result in supervisor.delegate_tasks_as_completed(tasks)]
+        
+        # The slow agent's worker takes t0 and holds it while the fast one drains the rest
+        assert [result.task_id for result in results] == ["t1", "t2", "t3", "t4", "t5", "t0"]
+    
+    @pytest.mark.asyncio
+    async def test_worker_pool_reports_failed_tasks(self, supervisor):
+        """Test an agent exception becomes a failed TaskResult without stopping other tasks."""
+        async def run(task):
+            if task["task_id"] == "t1":
+                raise RuntimeError("search quota exceeded")
+            return completed_result(task)
+        
+        supervisor.add_sub_agent(StubAgent("agent", ["web_search"], run))
+        tasks = [{"task_id": f"t{i}", "type": "web_search", "description": f"task {i}"} for i in range(3)]
+        
+        results = {result.task_id: result for result in await supervisor.delegate_tasks(tasks)}
+        
+        assert results["t1"].status == "failed"
+        assert "search quota exceeded" in results["t1"].findings
+        assert results["t0"].status == results["t2"].status == "completed"
+    
+    @pytest.mark.asyncio
+    async def test_preflight_is_shared_and_retried_after_failure(self, supervisor):
+        """Test concurrent callers share one preflight call and a failed call is not memoized."""
+        preflight = {"questions": ["Q1?", "Q2?", "Q3?"], "explanation": "why",
+                     "complexity": {"is_complex": False, "main_aspects": ["topic"]}}
+        supervisor._chat_json = AsyncMock(side_effect=[RuntimeError("API down"), preflight])
+        
+        with pytest.raises(RuntimeError):
+            await supervisor._preflight("topic")
+        (questions, _), analysis = await asyncio.gather(
+            supervisor.generate_follow_up_questions("topic"),
+            supervisor.analyze_topic_complexity("topic")
+        )
+        
+        assert questions == ["Q1?", "Q2?", "Q3?"]
+        assert analysis == preflight["complexity"]
+        assert supervisor._chat_json.await_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_plan_with_context_reuses_preflight_complexity(self, supervisor):
+        """Test planning after follow-up questions skips a second complexity call."""
+        preflight = {"questions": ["Q1?"], "explanation": "why",
+                     "complexity": {"is_complex": True, "main_aspects": ["cost", "safety"],
+                                    "recommended_subtopics": 2, "research_approach": "analytical"}}
+        subtopics = {"subtopics": [
+            {"query": "topic cost", "description": "Cost", "context": "cost"},
+            {"query": "topic safety", "description": "Safety", "context": "safety"}
+        ]}
+        supervisor._chat_json = AsyncMock(side_effect=[preflight, subtopics])
+        
+        await supervisor.generate_follow_up_questions("topic")
+        tasks = await supervisor.plan_research("topic", "User answers: focus on Europe")
+        
+        assert [task["query"] for task in tasks] == ["topic cost", "topic safety"]
+        assert supervisor._chat_json.await_count == 2
+        # The user's answers still shape the subtopic prompt
+        subtopic_prompt = supervisor._chat_json.await_args_list[1].args[0][1]["content"]
+        assert "focus on Europe" in subtopic_prompt
+    
+    @pytest.mark.asyncio
+    async def test_plan_with_context_on_cold_memo_analyzes_with_context(self, supervisor):
+        """Test planning with context and no earlier preflight asks for a context-aware analysis."""
+        analysis = {"is_complex": False, "main_aspects": ["topic"]}
+        supervisor._chat_json = AsyncMock(return_value=analysis)
+        
+        tasks = await supervisor.plan_research("topic", "User answers: focus on Europe")
+        
+        supervisor._chat_json.assert_awaited_once()
+        complexity_prompt = supervisor._chat_json.await_args.args[0][1]["content"]
+        assert "Analyze the research topic" in complexity_prompt
+        assert "focus on Europe" in complexity_prompt
+        assert [task["query"] for task in tasks] == ["topic"]
+    
+    @pytest.mark.asyncio
+    async def test_batch_chat_json_aligns_results_with_items(self, supervisor):
+        """Test short or malformed batched replies are padded with None per item."""
+        supervisor._chat_json = AsyncMock(return_value={"results": [{"query": "q1"}, "junk"]})
+        
+        results = await supervisor._batch_chat_json([{"n": 1}, {"n": 2}, {"n": 3}], "system")
+        
+        assert results == [{"query": "q1"}, None, None]
+    
+    @pytest.mark.asyncio
+    async def test_batched_subtopics_fill_missing_fields(self, supervisor):
+        """Test partial batched subtopics get aspect defaults and still build tasks."""
+        analysis = {"is_complex": True, "main_aspects": ["cost", "safety", "law", "jobs"],
+                    "research_approach": "analytical"}
+        supervisor._chat_json = AsyncMock(return_value={"results": [
+            {"query": "q1"}, {"query": "q2", "description": "Safety record"}, {}, {"query": "q4", "context": ""}
+        ]})
+        
+        sub_topics = await supervisor.analyze_and_break_down_topic("topic", "context", analysis)
+        tasks = supervisor._build_tasks(sub_topics)
+        
+        assert [task["query"] for task in tasks] == ["q1", "q2", "topic law", "q4"]
+        assert [task["description"] for task in tasks] == [
+            "Research on cost", "Safety record", "Research on law", "Research on jobs"]
+        assert tasks[3]["context"] == "jobs"
+    
+    @pytest.mark.asyncio
+    async def test_batched_subtopics_honour_recommended_count(self, supervisor):
+        """Test the batched path creates no more subtopics than recommended."""
+        analysis = {"is_complex": True, "main_aspects": ["cost", "safety", "law", "jobs", "energy"],
+                    "recommended_subtopics": 4}
+        supervisor._chat_json = AsyncMock(return_value={"results": []})
+        
+        sub_topics = await supervisor.analyze_and_break_down_topic("topic", "context", analysis)
+        
+        assert [sub_topic["context"] for sub_topic in sub_topics] == ["cost", "safety", "law", "jobs"]
+    
+    @staticmethod
+    def mock_batch_api(supervisor, respond):
+        """
+        Point supervisor at a fake Batch API. respond(custom_ids) returns the
+        output lines for one submitted batch; returns the list of submissions.
+        """
+        submitted = []
+        
+        async def create_file(file, purpose):
+            submitted.append([orjson.loads(line)["custom_id"] for line in file[1].split(b"\n")])
+            return Mock(id=f"file-{len(submitted)}")
+        
+        async def file_content(file_id):
+            return Mock(text="\n".join(respond(submitted[-1])))
+        
+        supervisor.client = Mock()
+        supervisor.client.files.create = AsyncMock(side_effect=create_file)
+        supervisor.client.files.content = AsyncMock(side_effect=file_content)
+        supervisor.client.batches.create = AsyncMock(
+            return_value=Mock(id="batch", status="completed", output_file_id="out"))
+        supervisor.use_batch_api = True
+        return submitted
+    
+    @staticmethod
+    def batch_line(custom_id, reply=None, body=None):
+        """One Batch API output line whose message content is reply as JSON (or a raw body)."""
+        if body is None:
+            body = {"choices": [{"message": {"content": orjson.dumps(reply).decode()}}]}
+        return orjson.dumps({"custom_id": custom_id,
+                             "response": {"status_code": 200, "body": body}}).decode()
+    
+    @pytest.mark.asyncio
+    async def test_plan_research_batch_falls_back_on_bad_batch_lines(self, supervisor):
+        """Test malformed Batch API output lines fall back per topic instead of failing the plan."""
+        def respond(custom_ids):
+            if custom_ids[0].endswith(":preflight"):
+                alpha_id, beta_id = custom_ids
+                simple = {"questions": ["Q?"], "explanation": "",
+                          "complexity": {"is_complex": False, "main_aspects": ["alpha"]}}
+                return [self.batch_line(alpha_id, simple), "{not json",
+                        self.batch_line(beta_id, body={"choices": []})]
+            return [self.batch_line(custom_id, body={"error": "no choices"}) for custom_id in custom_ids]
+        
+        submitted = self.mock_batch_api(supervisor, respond)
+        plans = await supervisor.plan_research_batch(["alpha", "beta topic with many words"])
+        
+        # alpha is simple; beta falls back to a complex analysis, then to a single fallback subtopic
+        assert len(submitted) == 2
+        assert [task["query"] for task in plans["alpha"]] == ["alpha"]
+        assert [task["query"] for task in plans["beta topic with many words"]] == ["beta topic with many words"]
+    
+    @pytest.mark.asyncio
+    async def test_plan_research_batch_matches_live_breakdown(self, supervisor):
+        """Test a malformed complexity reply falls back and many aspects use the per-aspect breakdown."""
+        aspects = ["cost", "safety", "law", "jobs"]
+        
+        def respond(custom_ids):
+            if custom_ids[0].endswith(":preflight"):
+                alpha_id, beta_id = custom_ids
+                complex_reply = {"questions": ["Q?"], "explanation": "",
+                                 "complexity": {"is_complex": True, "main_aspects": aspects,
+                                                "recommended_subtopics": 4}}
+                return [self.batch_line(alpha_id, {"questions": ["Q?"], "complexity": "high"}),
+                        self.batch_line(beta_id, complex_reply)]
+            return [self.batch_line(custom_ids[0], {"results": [{"query": "beta cost"}]})]
+        
+        self.mock_batch_api(supervisor, respond)
+        plans = await supervisor.plan_research_batch(["alpha", "beta"])
+        
+        assert [task["query"] for task in plans["alpha"]] == ["alpha"]
+        assert [task["query"] for task in plans["beta"]] == [
+            "beta cost", "beta safety", "beta law", "beta jobs"]
+        
+        # The live planner builds the same tasks from the same replies
+        supervisor._chat_json = AsyncMock(return_value={"results": [{"query": "beta cost"}]})
+        live = await supervisor.analyze_and_break_down_topic(
+            "beta", "context", {"is_complex": True, "main_aspects": aspects, "recommended_subtopics": 4})
+        assert [sub_topic["query"] for sub_topic in live] == [task["query"] for task in plans["beta"]]
 
 # ============================================================================
 # REPORTER.PY TESTS
@@ -176,11 +548,12 @@ class TestReporter:
         assert "Results:" in report
     
     @pytest.mark.asyncio
-    async def test_generate_report_single_result(self, sample_task_result):
+    async def test_generate_report_single_result(self, sample_task_result, tmp_path):
         """Test report generation with single result."""
-        reporter = Reporter()
+        reporter = Reporter(cache=LLMResponseCache(cache_dir=str(tmp_path)))
         
-        report = await reporter.generate_report("Single Result Test", [sample_task_result])
+        with patch("reporter.cached_chat_completion", new=AsyncMock(side_effect=RuntimeError("API unavailable"))):
+            report = await reporter.generate_report("Single Result Test", [sample_task_result])
         
         assert "Single Result Test" in report
         assert "test_task_1" in report
@@ -191,9 +564,9 @@ class TestReporter:
         assert "completed" in report
     
     @pytest.mark.asyncio
-    async def test_generate_report_multiple_results(self):
+    async def test_generate_report_multiple_results(self, tmp_path):
         """Test report generation with multiple results."""
-        reporter = Reporter()
+        reporter = Reporter(cache=LLMResponseCache(cache_dir=str(tmp_path)))
         
         # Create TaskResult objects properly
         result1 = TaskResult(
@@ -215,7 +588,8 @@ class TestReporter:
         
         results = [result1, result2]
         
-        report = await reporter.generate_report("Multiple Results Test", results)
+        with patch("reporter.cached_chat_completion", new=AsyncMock(side_effect=RuntimeError("API unavailable"))):
+            report = await reporter.generate_report("Multiple Results Test", results)
         
         assert "Multiple Results Test" in report
         assert "task_1" in report
@@ -225,6 +599,177 @@ class TestReporter:
         assert "source1.com" in report
         assert "source2.com" in report
 
+    @pytest.mark.asyncio
+    async def test_stream_failure_replaces_queued_paragraphs(self, sample_task_result, tmp_path):
+        """Test a stream that fails partway queues a reset and then the fallback report."""
+        reporter = Reporter(cache=LLMResponseCache(cache_dir=str(tmp_path)))
+        
+        async def failing_stream(*args, on_paragraph=None, **kwargs):
+            on_paragraph("# Partial report")
+            raise RuntimeError("stream dropped")
+        
+        queue = asyncio.Queue()
+        with patch("reporter.cached_chat_completion", new=failing_stream):
+            report = await reporter.generate_report("AI", [sample_task_result], paragraph_queue=queue)
+        
+        items = [queue.get_nowait() for _ in range(queue.qsize())]
+        assert items[:2] == ["# Partial report", REPORT_RESET]
+        assert items[-1] is None
+        fallback_paragraphs = items[2:-1]
+        assert fallback_paragraphs[0].startswith("# Research Report: AI")
+        assert all(paragraph in report for paragraph in fallback_paragraphs)
+    
+    def test_prepare_findings_is_unindented(self, sample_task_result):
+        """Test finding sections carry no leading indentation into the prompt."""
+        reporter = Reporter()
+        
+        findings = reporter._prepare_findings_for_synthesis([sample_task_result, sample_task_result])
+        
+        assert findings.startswith("Research Finding #1:")
+        assert "\n---\nResearch Finding #2:" in findings
+        assert not any(line.startswith(" ") for line in findings.splitlines())
+    
+    def test_sources_deduplicated_across_results(self, sample_task_result):
+        """Test a URL cited by several results is listed and counted once."""
+        reporter = Reporter()
+        
+        findings = reporter._prepare_findings_for_synthesis([sample_task_result, sample_task_result])
+        stats = reporter._compute_stats([sample_task_result, sample_task_result])
+        
+        assert findings.count("• [healthcare.com]") == 1
+        assert "Same sources as earlier findings" in findings
+        assert stats.total_sources == 2
+    
+    def test_compute_stats(self, sample_task_result):
+        """Test aggregate metrics are collected in one pass."""
+        reporter = Reporter()
+        failed = TaskResult(
+            task_id="task_2",
+            task_description="Failed task",
+            findings="",
+            sources=["source3.com"],
+            confidence_score=0.25,
+            status="failed"
+        )
+        
+        stats = reporter._compute_stats([sample_task_result, failed])
+        
+        assert stats.total == 2
+        assert stats.completed == 1
+        assert stats.total_sources == 3
+        assert stats.avg_confidence == pytest.approx(0.55)
+
+# ============================================================================
+# SPEAKER.PY TESTS
+# ============================================================================
+
+class TestSpeaker:
+    """Test the Speaker class."""
+    
+    @pytest.fixture
+    def speaker(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.chdir(tmp_path)
+        return Speaker()
+    
+    def test_split_into_chunks_respects_max_length(self, speaker):
+        """Test sentences are packed into chunks no longer than max_length."""
+        text = "First sentence. Second sentence!\nThird line\n\nFourth one?"
+        
+        chunks = speaker._split_into_chunks(text, 35)
+        
+        assert chunks == ["First sentence. Second sentence!", "Third line Fourth one?"]
+        assert all(len(chunk) <= 35 for chunk in chunks)
+    
+    def test_split_into_chunks_single_chunk(self, speaker):
+        """Test short text stays in one chunk."""
+        assert speaker._split_into_chunks("Short. Text.", 4000) == ["Short. Text."]
+
+# ============================================================================
+# LLM_CACHE.PY TESTS
+# ============================================================================
+
+class TestLLMResponseCache:
+    """Test the on-disk LLM response cache."""
+    
+    def test_set_and_get(self, tmp_path):
+        """Test a stored response is returned for the same key."""
+        cache = LLMResponseCache(cache_dir=str(tmp_path))
+        key = cache.make_key("gpt-4o-mini", 0.3, [{"role": "user", "content": "hi"}])
+        
+        assert cache.get(key) is None
+        cache.set(key, "cached report")
+        assert cache.get(key) == "cached report"
+    
+    def test_key_depends_on_request(self):
+        """Test different prompts or temperatures produce different keys."""
+        messages = [{"role": "user", "content": "hi"}]
+        key = LLMResponseCache.make_key("gpt-4o-mini", 0.3, messages)
+        
+        assert key == LLMResponseCache.make_key("gpt-4o-mini", 0.3, messages)
+        assert key != LLMResponseCache.make_key("gpt-4o-mini", 0.7, messages)
+        assert key != LLMResponseCache.make_key("gpt-4o-mini", 0.3, [{"role": "user", "content": "bye"}])
+    
+    def test_expired_entry(self, tmp_path):
+        """Test expired entries are treated as misses."""
+        cache = LLMResponseCache(cache_dir=str(tmp_path), ttl_seconds=-1)
+        cache.set("key", "stale")
+        assert cache.get("key") is None
+    
+    @pytest.mark.asyncio
+    async def test_async_set_and_get(self, tmp_path):
+        """Test the thread-backed async accessors share entries with get/set."""
+        cache = ResponseCache(cache_dir=str(tmp_path))
+        
+        await cache.aset("key", "cached page")
+        assert await cache.aget("key") == "cached page"
+        assert cache.get("key") == "cached page"
+    
+    @pytest.mark.asyncio
+    async def test_cached_chat_completion_hit_skips_api(self, tmp_path):
+        """Test a cached completion is returned without calling the client."""
+        cache = LLMResponseCache(cache_dir=str(tmp_path))
+        messages = [{"role": "user", "content": "hi"}]
+        cache.set(cache.make_key("gpt-4o-mini", 0.3, messages), "cached report")
+        client = Mock()
+        
+        content = await cached_chat_completion(client, cache, messages, "gpt-4o-mini", 0.3)
+        
+        assert content == "cached report"
+        client.chat.completions.create.assert_not_called()
+
+# ============================================================================
+# CLIENTS.PY TESTS
+# ============================================================================
+
+class TestRateLimiter:
+    """Test the header-driven request rate limiter."""
+
+    def test_slows_down_when_budget_low(self):
+        """Test the rate drops to the remaining budget below 10%."""
+        limiter = RateLimiter(max_rate=500, time_period=60)
+        limiter.update_from_headers({"x-ratelimit-remaining-requests": "20",
+                                     "x-ratelimit-limit-requests": "500"})
+        assert limiter.rate == 20
+
+        limiter.update_from_headers({"x-ratelimit-remaining-requests": "400",
+                                     "x-ratelimit-limit-requests": "500"})
+        assert limiter.rate == 500
+
+    def test_ignores_missing_headers(self):
+        """Test responses without rate-limit headers leave the rate alone."""
+        limiter = RateLimiter(max_rate=100)
+        limiter.update_from_headers({})
+        assert limiter.rate == 100
+
+    @pytest.mark.asyncio
+    async def test_acquire_takes_a_token(self):
+        """Test acquiring consumes one token from the bucket."""
+        limiter = RateLimiter(max_rate=2, time_period=60)
+        async with limiter:
+            pass
+        assert limiter._tokens < 2
+
 # ============================================================================
 # MAIN_SYSTEM.PY TESTS (Limited due to abstract Supervisor)
 # ============================================================================
@@ -250,10 +795,10 @@ class TestWorkingComponents:
     """Test components that actually work together."""
     
     @pytest.mark.asyncio
-    async def test_web_researcher_and_reporter_integration(self):
+    async def test_web_researcher_and_reporter_integration(self, tmp_path):
         """Test WebResearcher output works with Reporter."""
         researcher = WebResearcher()
-        reporter = Reporter()
+        reporter = Reporter(cache=LLMResponseCache(cache_dir=str(tmp_path)))
         
         # Create a sample task
         task = {
@@ -262,7 +807,8 @@ class TestWorkingComponents:
         }
         
         # Mock the web search method
-        with patch.object(researcher, 'perform_web_search', return_value="Python is a versatile programming language"):
+        with patch.object(researcher, 'perform_web_search', return_value="Python is a versatile programming language"), \
+             patch("reporter.cached_chat_completion", new=AsyncMock(side_effect=RuntimeError("API unavailable"))):
             # Execute task
             result = await researcher.execute_task(task)
             
@@ -1,14 +1,128 @@
 import aiohttp
 import asyncio
-import openai
+import hashlib
 import os
-import json
-import pytest
-from typing import Any, Dict, List, Optional
-from bs4 import BeautifulSoup
+import orjson
+import re
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from lxml import etree, html as lxml_html
 from urllib.parse import urljoin, urlparse, quote_plus
-from dotenv import load_dotenv
 from agent import BaseAgent, TaskResult
+from clients import get_openai
+from llm_cache import ResponseCache
+from _hot import hamming_distance, simhash64
+
+_WS_RE = re.compile(r'\s+')
+
+# Sent with every page request
+_SCRAPE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Removed from pages before text extraction: page chrome, non-text markup
+# and comments
+_STRIPPED_TAGS = (etree.Comment, "script", "style", "noscript", "template", "svg", "iframe",
+                  "nav", "header", "footer")
+
+# Main-content candidates in priority order (article, main, .content,
+# .article-body, body); each is a compiled XPath that stops at the first match
+_CONTENT_XPATHS = tuple(etree.XPath(path) for path in (
+    "(//article)[1]",
+    "(//main)[1]",
+    "(//*[contains(concat(' ', normalize-space(@class), ' '), ' content ')])[1]",
+    "(//*[contains(concat(' ', normalize-space(@class), ' '), ' article-body ')])[1]",
+    "(//body)[1]"
+))
+
+@lru_cache(maxsize=32)
+def _html_parser(encoding: Optional[str]) -> lxml_html.HTMLParser:
+    """lxml HTML parser for the given charset (None lets lxml sniff <meta>)."""
+    try:
+        return lxml_html.HTMLParser(encoding=encoding)
+    except LookupError:
+        return lxml_html.HTMLParser()
+
+# Domain reputation: trusted suffixes anywhere in the host (so .gov.uk and
+# .edu.au count) and well-known news outlets
+_TRUSTED_DOMAIN_RE = re.compile(r'\.(?:edu|gov|org)')
+_NEWS_DOMAIN_RE = re.compile(r'bbc|reuters|cnn|nytimes')
+
+@lru_cache(maxsize=1024)
+def _domain_score(domain: str) -> float:
+    """Relevance bonus for a source domain."""
+    if _TRUSTED_DOMAIN_RE.search(domain):
+        return 0.3
+    if _NEWS_DOMAIN_RE.search(domain):
+        return 0.2
+    return 0.0
+
+# URL path suffixes of documents and media that are never scraped as HTML
+_SKIP_EXT = ('.pdf', '.doc', '.docx', '.ppt', '.pptx', '.xls', '.xlsx', '.zip',
+             '.jpg', '.jpeg', '.png', '.gif', '.mp4', '.mp3', '.webm')
+
+def _is_html_candidate(url: str) -> bool:
+    """False for URLs whose path names a document or media file."""
+    return not urlparse(url).path.lower().endswith(_SKIP_EXT)
+
+_TOKEN_RE = re.compile(r'\w+')
+
+# Words that carry no topical signal when matching a query against a page
+_STOPWORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "what", "when", "where", "which", "who",
+    "why", "with"
+))
+
+def _tokenize(text: str) -> frozenset:
+    """Lower-cased word tokens of text, without stopwords."""
+    return frozenset(token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS)
+
+# Common website noise stripped from scraped text, as one alternation so the
+# content is scanned once
+_NOISE_RE = re.compile(
+    r'(?:Cookie Policy|Privacy Policy|Terms of Service|Subscribe to|Follow us).*?(?=\w)',
+    re.IGNORECASE
+)
+
+SYSTEM_PROMPT_SYNTHESIS = "You are an expert research analyst who synthesizes information from multiple sources to provide focused, accurate insights."
+
+_SYNTHESIS_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT_SYNTHESIS}
+
+_SYNTHESIS_PROMPT_TEMPLATE = """You are a research analyst tasked with synthesizing information about a specific research question.
+
+Research Query: "{query}"
+Research Description: "{description}"
+Research Context: "{context}"
+
+Based on the following extracted information from web sources, provide a comprehensive, well-structured analysis:
+
+{content_summary}
+
+Please provide:
+1. A clear, focused answer to the research question
+2. Key findings and insights
+3. Important data points or statistics (if available)
+4. Different perspectives or viewpoints (if present)
+5. Current trends or developments
+6. Limitations or gaps in the available information
+
+Requirements:
+- Focus specifically on the research query, not broader topics
+- Be objective and factual
+- Cite source domains when referencing specific information
+- Acknowledge uncertainty when information is limited
+- Provide actionable insights where possible
+- Keep the response comprehensive but concise (aim for 300-500 words)
+
+Format your response as a well-structured research summary.
+"""
+
+_SOURCE_SUMMARY_TEMPLATE = """Source {index} - {domain}:
+Title: {title}
+Relevance Score: {relevance:.2f}
+Content: {content}...
+"""
 
 class WebResearcher(BaseAgent):
     def __init__(self):
@@ -16,16 +130,83 @@ class WebResearcher(BaseAgent):
         self.capabilities = ["web_search", "content_extraction", "fact_checking"]
         self.max_sources = 10
         self.timeout = 10
+        self._scrape_timeout = aiohttp.ClientTimeout(total=self.timeout)  # Reused by every page fetch
+        self.max_page_bytes = 200_000  # HTML read per page; plenty for 5000 chars of text
+        self._session: Optional[aiohttp.ClientSession] = None  # Shared by all page scrapes
+        self._search_session: Optional[aiohttp.ClientSession] = None  # Google Custom Search API
+        # Keep-alive pool sized to the scrape fan-out; the session itself needs
+        # a running loop, so it is created lazily in _get_session
+        self._connector_kwargs = {
+            "limit": self.max_sources,
+            "limit_per_host": 3,
+            "ttl_dns_cache": 300,
+            "keepalive_timeout": 30,
+            "enable_cleanup_closed": True
+        }
+        # Searches get their own pool, since every one goes to googleapis.com
+        # and the scrape pool's limit_per_host would hold them to 3. The limit
+        # keeps concurrent searches within Google's 10 QPS quota.
+        self._search_connector_kwargs = {**self._connector_kwargs, "limit": 10, "limit_per_host": 10}
         
-        # Initialize OpenAI client
-        load_dotenv()
-        self.client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # Search results and cleaned page text, reused across runs for a day
+        self.web_cache = ResponseCache(cache_dir=os.path.join(".llm_cache", "web"), ttl_seconds=24 * 3600)
+        self._inflight: Dict[str, asyncio.Future] = {}  # Cache key -> fetch in progress
+        
+        # Shared OpenAI client (one connection pool for all agents)
+        self.client = get_openai()
         
         # Google Search API credentials
         self.google_api_key = os.getenv("GOOGLE_SEARCH_API_KEY")
         self.google_search_engine_id = os.getenv("GOOGLE_SEARCH_ENGINE_ID")
     
-    @pytest.mark.asyncio
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Return the shared scraping session, creating it on first use.
+        One keep-alive pool serves every scrape, so repeat hosts skip the
+        DNS/TCP/TLS handshake.
+        """
+        if self._session is None or self._session.closed:
+            self._session = self._new_session(self._connector_kwargs)
+        return self._session
+    
+    async def _get_search_session(self) -> aiohttp.ClientSession:
+        """Return the Google search session, creating it on first use."""
+        if self._search_session is None or self._search_session.closed:
+            self._search_session = self._new_session(self._search_connector_kwargs)
+        return self._search_session
+    
+    @staticmethod
+    def _new_session(connector_kwargs: Dict[str, Any]) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(**connector_kwargs)
+        # No cookies needed; skip Set-Cookie parsing
+        return aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar())
+    
+    @staticmethod
+    def _web_cache_key(*parts: str) -> str:
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+    
+    async def _run_once(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fetch() for key unless it is already running; concurrent callers share one result."""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fetch())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+    
+    async def warm_up(self):
+        """Open the HTTP sessions before the first search."""
+        await self._get_search_session()
+        await self._get_session()
+    
+    async def aclose(self):
+        """Close the shared HTTP sessions."""
+        for session in (self._search_session, self._session):
+            if session is not None and not session.closed:
+                await session.close()
+        self._search_session = None
+        self._session = None
+    
     async def execute_task(self, task: Dict[str, Any]) -> TaskResult:
         query = task.get("query")
         description = task.get("description", "No description provided")
@@ -47,18 +228,17 @@ class WebResearcher(BaseAgent):
         search_results = await self.perform_web_search(query)
         
         # Step 2: Extract and clean content from web sources
-        extracted_content = await self.extract_content_from_sources(search_results)
+        # Query tokens are computed once and matched against every source
+        extracted_content = await self.extract_content_from_sources(search_results, _tokenize(query))
         
         # Step 3: Synthesize findings using LLM
         synthesized_findings = await self.synthesize_research_findings(
             query, description, context, extracted_content
         )
 
-        # Step 4: Extract reliable sources
-        reliable_sources = self.extract_reliable_sources(extracted_content)
-        
-        # Calculate confidence based on source quality and content relevance
-        confidence_score = self.calculate_confidence_score(extracted_content, reliable_sources)
+        # Step 4: Extract reliable sources and calculate confidence based on
+        # source quality and content relevance (one pass)
+        reliable_sources, confidence_score = self.extract_sources_and_confidence(extracted_content)
         
         return TaskResult(
             task_id=self.agent_id,
@@ -73,7 +253,6 @@ class WebResearcher(BaseAgent):
         """Check if the researcher can handle the given task type."""
         return task_type in ["web_search", "fact_checking", "current_events"]
     
-    @pytest.mark.asyncio
     async def perform_web_search(self, query: str) -> List[Dict[str, Any]]:
         """
         Perform web search using multiple strategies.
@@ -96,10 +275,21 @@ class WebResearcher(BaseAgent):
     async def call_google_search_api(self, query: str, num_results: int = 10) -> List[Dict[str, Any]]:
         """
         Call Google Custom Search API to get search results.
+        Results are cached per (query, num_results), and identical concurrent
+        searches share one request.
         """
         if not self.google_api_key or not self.google_search_engine_id:
             raise ValueError("Google Search API credentials not configured")
         
+        cache_key = self._web_cache_key("search", str(num_results), query)
+        cached = await self.web_cache.aget(cache_key)
+        if cached is not None:
+            return orjson.loads(cached)
+        return await self._run_once(cache_key,
+                                    lambda: self._fetch_google_search_results(query, num_results, cache_key))
+    
+    async def _fetch_google_search_results(self, query: str, num_results: int,
+                                           cache_key: str) -> List[Dict[str, Any]]:
         # Prepare the API URL
         base_url = "https://www.googleapis.com/customsearch/v1"
         
@@ -112,15 +302,18 @@ class WebResearcher(BaseAgent):
             'fields': 'items(title,link,snippet,displayLink)',  # Only get needed fields
         }
         
+        # Concurrent searches are bounded by the search session's connector
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(base_url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return self.parse_google_search_results(data)
-                    else:
-                        error_text = await response.text()
-                        raise Exception(f"Google Search API error {response.status}: {error_text}")
+            session = await self._get_search_session()
+            async with session.get(base_url, params=params) as response:
+                if response.status == 200:
+                    data = await response.json(loads=orjson.loads)
+                    search_results = self.parse_google_search_results(data)
+                    await self.web_cache.aset(cache_key, orjson.dumps(search_results).decode())
+                    return search_results
+                else:
+                    error_text = await response.text()
+                    raise Exception(f"Google Search API error {response.status}: {error_text}")
                         
         except Exception as e:
             print(f"Error calling Google Search API: {e}")
@@ -172,7 +365,8 @@ class WebResearcher(BaseAgent):
             }
         ]
 
-    async def extract_content_from_sources(self, search_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    async def extract_content_from_sources(self, search_results: List[Dict[str, Any]],
+                                           query_tokens: frozenset = frozenset()) -> List[Dict[str, Any]]:
         """Extract and clean content from web sources."""
         if not search_results:
             print("⚠️ No search results to extract content from")
@@ -180,97 +374,142 @@ class WebResearcher(BaseAgent):
         
         extracted_content = []
         limited_results = search_results[:self.max_sources]
-        semaphore = asyncio.Semaphore(3)
         
+        # Concurrency is bounded by the shared session's connector
+        # (limit_per_host), so no semaphore is needed here. The fan-out runs
+        # on whatever loop the caller started; main_system.py's entry point
+        # uses uvloop when installed, which schedules these tasks faster.
         async def extract_single_source(source: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-            async with semaphore:
-                try:
-                    content = await self.scrape_web_content(source["url"])
-                    if content and len(content) > 100:
-                        return {
-                            "url": source["url"],
-                            "title": source["title"],
-                            "domain": source["domain"],
-                            "content": content,
-                            "snippet": source.get("snippet", ""),
-                            "relevance_score": self.calculate_relevance_score(content, source)
-                        }
-                except Exception as e:
-                    print(f"Failed to extract from {source.get('url', 'unknown')}: {e}")
+            try:
+                # Skip PDFs, images and other files by extension without a request
+                if not _is_html_candidate(source["url"]):
                     return None
+                content = await self.scrape_web_content(source["url"])
+                if content and len(content) > 100:
+                    return {
+                        "url": source["url"],
+                        "title": source["title"],
+                        "domain": source["domain"],
+                        "content": content,
+                        "snippet": source.get("snippet", ""),
+                        "relevance_score": self.calculate_relevance_score(content, source, query_tokens)
+                    }
+            except Exception as e:
+                # The handler must not raise too, or one malformed result
+                # would abort the whole gather
+                url = source.get("url", "unknown") if isinstance(source, dict) else repr(source)
+                print(f"Failed to extract from {url}: {e}")
+            return None
         
-        extraction_tasks = [extract_single_source(source) for source in limited_results]
-        results = await asyncio.gather(*extraction_tasks, return_exceptions=True)
+        # extract_single_source handles its own errors, so anything that
+        # escapes (e.g. cancellation) propagates instead of being filtered
+        results = await asyncio.gather(*(extract_single_source(source) for source in limited_results))
         
         # Filter out failed extractions
-        extracted_content = [result for result in results 
-                        if result is not None and isinstance(result, dict)]
+        extracted_content = [result for result in results if result is not None]
         
-        # Sort by relevance score
+        # Sort by relevance score, then drop syndicated copies so the top
+        # sources sent to synthesis are distinct
         extracted_content.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
+        extracted_content = self.deduplicate_sources(extracted_content)
         
         print(f"📄 Successfully extracted content from {len(extracted_content)} sources")
         return extracted_content
+    
+    def deduplicate_sources(self, extracted_content: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Drop exact and near-duplicate pages, keeping the first (highest-ranked) copy.
+        Near-duplicates are pages whose SimHash over the first 1000 characters
+        differs in fewer than 8 of 64 bits (unrelated pages differ in ~32).
+        """
+        unique_content = []
+        seen_texts = set()
+        fingerprints = []
+        for content_item in extracted_content:
+            text = content_item["content"].strip()
+            if text in seen_texts:
+                continue
+            fingerprint = simhash64(text[:1000])
+            if any(hamming_distance(fingerprint, other) < 8 for other in fingerprints):
+                continue
+            seen_texts.add(text)
+            fingerprints.append(fingerprint)
+            unique_content.append(content_item)
+        return unique_content
         
     async def scrape_web_content(self, url: str) -> Optional[str]:
         """
         Scrape content from a web page.
+        Cleaned text is cached per URL, and concurrent scrapes of the same URL
+        share one download.
         """
+        cache_key = self._web_cache_key("scrape", url)
+        cached = await self.web_cache.aget(cache_key)
+        if cached is not None:
+            return cached
+        return await self._run_once(cache_key, lambda: self._fetch_web_content(url, cache_key))
+    
+    async def _fetch_web_content(self, url: str, cache_key: str) -> Optional[str]:
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
+            session = await self._get_session()
+            async with session.get(url, headers=_SCRAPE_HEADERS,
+                                   timeout=self._scrape_timeout) as response:
+                if response.status != 200:
+                    return None
+                # Skip PDFs, images and other non-HTML bodies without downloading them
+                if response.content_type not in ("text/html", "application/xhtml+xml"):
+                    return None
                 
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        html = await response.text()
-                        
-                        # Parse with BeautifulSoup
-                        soup = BeautifulSoup(html, 'html.parser')
-                        
-                        # Remove script and style elements
-                        for script in soup(["script", "style", "nav", "header", "footer"]):
-                            script.decompose()
-                        
-                        # Extract main content
-                        content_selectors = ['article', 'main', '.content', '.article-body', 'body']
-                        content = ""
-                        
-                        for selector in content_selectors:
-                            elements = soup.select(selector)
-                            if elements:
-                                content = elements[0].get_text(strip=True, separator=' ')
-                                break
-                        
-                        if not content:
-                            content = soup.get_text(strip=True, separator=' ')
-                        
-                        # Clean up content
-                        content = self.clean_extracted_content(content)
-                        
-                        return content[:5000]  # Limit content length
+                # Stream the body and stop at max_page_bytes; raw bytes go
+                # straight to lxml, which decodes while parsing
+                buffer = bytearray()
+                async for chunk in response.content.iter_chunked(16384):
+                    buffer.extend(chunk)
+                    if len(buffer) >= self.max_page_bytes:
+                        break
+                html_bytes = bytes(buffer)
+                charset = response.charset
+            
+            if not html_bytes.strip():
+                return None
+            tree = lxml_html.fromstring(html_bytes, parser=_html_parser(charset))
+            
+            # Remove script and style elements and comments (one pass in C)
+            etree.strip_elements(tree, *_STRIPPED_TAGS, with_tail=False)
+            
+            # Extract main content from the first matching candidate
+            root = tree
+            for xpath in _CONTENT_XPATHS:
+                elements = xpath(tree)
+                if elements:
+                    root = elements[0]
+                    break
+            
+            content = self._element_text(root)
+            if not content:
+                content = self._element_text(tree)
+            
+            # Clean up content
+            content = self.clean_extracted_content(content)[:5000]  # Limit content length
+            
+            if content:
+                await self.web_cache.aset(cache_key, content)
+            return content
                     
         except Exception as e:
             print(f"Error scraping {url}: {e}")
             return None
 
+    def _element_text(self, element) -> str:
+        """Text of an lxml element, stripped pieces joined by single spaces."""
+        return ' '.join(text.strip() for text in element.itertext() if text.strip())
+
     def clean_extracted_content(self, content: str) -> str:
         """Clean and normalize extracted content."""
-        import re
-        content = re.sub(r'\s+', ' ', content)
+        content = _WS_RE.sub(' ', content)
         
         # Remove common website noise
-        noise_patterns = [
-            r'Cookie Policy.*?(?=\w)',
-            r'Privacy Policy.*?(?=\w)',
-            r'Terms of Service.*?(?=\w)',
-            r'Subscribe to.*?(?=\w)',
-            r'Follow us.*?(?=\w)'
-        ]
-        
-        for pattern in noise_patterns:
-            content = re.sub(pattern, '', content, flags=re.IGNORECASE)
+        content = _NOISE_RE.sub('', content)
         
         return content.strip()
     
@@ -279,7 +518,7 @@ class WebResearcher(BaseAgent):
         try:
             parsed = urlparse(url)
             return parsed.netloc
-        except:
+        except ValueError:
             return "unknown-domain"
     
     async def synthesize_research_findings(self, query: str, description: str, 
@@ -288,73 +527,74 @@ class WebResearcher(BaseAgent):
         Use LLM to synthesize research findings from extracted content.
         This is the key step that transforms raw content into focused insights.
         """
+        try:
+            chunks = [delta async for delta in self.synthesize_research_findings_stream(
+                query, description, context, extracted_content)]
+            return "".join(chunks)
+        except Exception:
+            # The stream already reported the error; fall back to basic summary
+            return self.create_fallback_summary(query, extracted_content)
+
+    async def synthesize_research_findings_stream(self, query: str, description: str,
+                                                  context: str, extracted_content: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        """
+        Like synthesize_research_findings, but yield text as the model streams it.
+        If the call fails before any text arrives, the fallback summary is
+        yielded instead; a failure mid-stream is raised.
+        """
         if not extracted_content:
-            return f"Unable to find substantial information about '{query}'. No reliable sources were accessible."
+            yield f"Unable to find substantial information about '{query}'. No reliable sources were accessible."
+            return
         
         # Prepare content summary for LLM
         content_summary = self.prepare_content_for_synthesis(extracted_content)
         
-        synthesis_prompt = f"""
-        You are a research analyst tasked with synthesizing information about a specific research question.
-        
-        Research Query: "{query}"
-        Research Description: "{description}"
-        Research Context: "{context}"
-        
-        Based on the following extracted information from web sources, provide a comprehensive, well-structured analysis:
-        
-        {content_summary}
-        
-        Please provide:
-        1. A clear, focused answer to the research question
-        2. Key findings and insights
-        3. Important data points or statistics (if available)
-        4. Different perspectives or viewpoints (if present)
-        5. Current trends or developments
-        6. Limitations or gaps in the available information
-        
-        Requirements:
-        - Focus specifically on the research query, not broader topics
-        - Be objective and factual
-        - Cite source domains when referencing specific information
-        - Acknowledge uncertainty when information is limited
-        - Provide actionable insights where possible
-        - Keep the response comprehensive but concise (aim for 300-500 words)
-        
-        Format your response as a well-structured research summary.
-        """
+        synthesis_prompt = _SYNTHESIS_PROMPT_TEMPLATE.format(
+            query=query,
+            description=description,
+            context=context,
+            content_summary=content_summary
+        )
 
+        started = False
         try:
-            response = await self.client.chat.completions.create(
+            stream = await self.client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
-                    {"role": "system", "content": "You are an expert research analyst who synthesizes information from multiple sources to provide focused, accurate insights."},
+                    _SYNTHESIS_SYSTEM_MESSAGE,
                     {"role": "user", "content": synthesis_prompt}
                 ],
                 temperature=0.3,  # Lower temperature for more factual responses
-                max_tokens=800
+                max_tokens=800,
+                stream=True
             )
-            
-            synthesized_findings = response.choices[0].message.content
-            return synthesized_findings
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    started = True
+                    yield delta
             
         except Exception as e:
             print(f"Error synthesizing findings: {e}")
+            if started:
+                raise
             # Fallback to basic summary
-            return self.create_fallback_summary(query, extracted_content)
+            yield self.create_fallback_summary(query, extracted_content)
 
     def prepare_content_for_synthesis(self, extracted_content: List[Dict[str, Any]]) -> str:
         """Prepare extracted content for LLM synthesis."""
         content_parts = []
         
         for i, content_item in enumerate(extracted_content[:3], 1):  # Limit to top 3 sources
-            source_summary = f"""
-            Source {i} - {content_item['domain']}:
-            Title: {content_item['title']}
-            Relevance Score: {content_item.get('relevance_score', 0):.2f}
-            Content: {content_item['content'][:1000]}...
-            """
-            content_parts.append(source_summary)
+            content_parts.append(_SOURCE_SUMMARY_TEMPLATE.format(
+                index=i,
+                domain=content_item['domain'],
+                title=content_item['title'],
+                relevance=content_item.get('relevance_score', 0),
+                content=content_item['content'][:1000]
+            ))
         
         return "\n".join(content_parts)
     
@@ -378,29 +618,45 @@ class WebResearcher(BaseAgent):
     def calculate_confidence_score(self, extracted_content: List[Dict[str, Any]], 
                                  sources: List[str]) -> float:
         """Calculate confidence score based on source quality and content."""
-        if not extracted_content:
+        total_relevance = sum(content.get("relevance_score", 0) for content in extracted_content)
+        return self._confidence(len(sources), total_relevance, len(extracted_content))
+    
+    def extract_sources_and_confidence(self, extracted_content: List[Dict[str, Any]]) -> Tuple[List[str], float]:
+        """Reliable source URLs and the confidence score from a single pass over extracted_content."""
+        # Plain loop on purpose: extracted_content holds at most max_sources
+        # items, and np.fromiter would walk the same dicts before summing
+        sources = []
+        total_relevance = 0.0
+        for content in extracted_content:
+            relevance = content.get("relevance_score", 0)
+            total_relevance += relevance
+            if relevance > 0.1:
+                sources.append(content["url"])
+        return sources, self._confidence(len(sources), total_relevance, len(extracted_content))
+    
+    def _confidence(self, source_count: int, total_relevance: float, content_count: int) -> float:
+        if not content_count:
             return 0.0
         
         # Base score from number of sources
-        source_score = min(len(sources) * 0.2, 0.6)
+        source_score = min(source_count * 0.2, 0.6)
         
         # Quality score from average relevance
-        avg_relevance = sum(content.get("relevance_score", 0) 
-                          for content in extracted_content) / len(extracted_content)
-        quality_score = avg_relevance * 0.4
+        quality_score = (total_relevance / content_count) * 0.4
         
         return min(source_score + quality_score, 0.95)  # Cap at 0.95
     
-    def calculate_relevance_score(self, content: str, source: Dict[str, Any]) -> float:
-        """Calculate relevance score for extracted content."""
+    def calculate_relevance_score(self, content: str, source: Dict[str, Any],
+                                  query_tokens: frozenset = frozenset()) -> float:
+        """
+        Calculate relevance score for extracted content.
+        query_tokens (from _tokenize) adds up to 0.3 for query words found in
+        the title or the first 500 characters of content.
+        """
         score = 0.0
         
         # Domain reputation scoring
-        domain = source.get("domain", "")
-        if any(trusted in domain for trusted in [".edu", ".gov", ".org"]):
-            score += 0.3
-        elif any(news in domain for news in ["bbc", "reuters", "cnn", "nytimes"]):
-            score += 0.2
+        score += _domain_score(source.get("domain", ""))
         
         # Content length scoring
         if len(content) > 1000:
@@ -413,4 +669,9 @@ class WebResearcher(BaseAgent):
         if len(title) > 10:
             score += 0.1
         
+        # Query keyword matching: share of query tokens present on the page
+        if query_tokens:
+            page_tokens = _tokenize(title + " " + content[:500])
+            score += 0.3 * len(query_tokens & page_tokens) / len(query_tokens)
+        
         return min(score, 1.0)  # Cap at 1.0
\ No newline at end of file